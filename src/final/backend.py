@@ -0,0 +1,226 @@
+"""
+추론 백엔드 (PyTorch / ONNX Runtime / OpenVINO)
+
+GPU 없는 검사 PC에서 CPU 추론을 빠르게 하기 위해 best.pt를 ONNX 또는 OpenVINO로 변환해서 사용.
+변환 파일은 처음 한 번만 만들고, best.pt가 더 새로우면 다시 만듦.
+INT8은 우리 이미지(CALIB_DIR)로 보정(calibration)해서 양자화.
+변환한 모델은 PyTorch 결과와 비교(check_parity)해서 허용 오차 안인지 확인.
+
+python backend.py export --backend openvino --int8
+python backend.py check --backend onnx --imgsz 320
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from batch_inspect import IMAGE_EXTS
+from inference import predict, run_batch
+from tracker import iou
+
+BACKENDS = ("torch", "onnx", "openvino")
+CALIB_DIR = "static"  # INT8 보정/결과 비교에 사용할 이미지 폴더
+CALIB_LIMIT = 200     # 보정에 사용할 최대 이미지 수
+
+
+def export_path(weights, backend, int8=False):
+    """백엔드별 변환 파일 경로 (ultralytics export 이름 규칙)"""
+    stem = os.path.splitext(weights)[0]
+    suffix = "_int8" if int8 else ""
+    if backend == "onnx":
+        return f"{stem}{suffix}.onnx"
+    if backend == "openvino":
+        return f"{stem}{suffix}_openvino_model"
+    return weights
+
+
+def load_images(image_dir, limit=CALIB_LIMIT):
+    """폴더의 이미지를 최대 limit개까지 읽기 (BGR)"""
+    if not os.path.isdir(image_dir):
+        return []
+    paths = sorted(os.path.join(image_dir, name) for name in os.listdir(image_dir)
+                   if os.path.splitext(name)[1].lower() in IMAGE_EXTS)
+    images = (cv2.imread(path) for path in paths[:limit])
+    return [image for image in images if image is not None]
+
+
+def letterbox(image, imgsz):
+    """비율을 유지해서 imgsz x imgsz로 맞추고 남는 곳은 회색(114)으로 채움 (YOLO 전처리와 동일)"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top+new_h, left:left+new_w] = cv2.resize(image, (new_w, new_h),
+                                                          interpolation=cv2.INTER_LINEAR)
+    return canvas
+
+
+def quantize_onnx(onnx_path, out_path, images, imgsz):
+    """ONNX Runtime 정적 양자화 (이미지로 활성값 범위 보정)"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self.images = iter(images)
+
+        def get_next(self):
+            image = next(self.images, None)
+            if image is None:
+                return None
+            # BGR HWC uint8 -> RGB NCHW float32 (0~1)
+            blob = letterbox(image, imgsz)[:, :, ::-1].transpose(2, 0, 1)[None]
+            return {input_name: np.ascontiguousarray(blob, dtype=np.float32) / 255.0}
+
+    quantize_static(onnx_path, out_path, ImageReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def export_model(weights, backend, imgsz, int8=False, calib_dir=CALIB_DIR):
+    """best.pt를 backend 형식으로 변환하고 변환 파일 경로 반환"""
+    model = YOLO(weights)
+
+    if backend == "onnx":
+        # 카메라 여러 대를 한 번에 추론하므로 배치 크기는 가변(dynamic)으로 변환
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            images = load_images(calib_dir)
+            if not images:
+                raise ValueError(f"INT8 보정용 이미지가 없습니다. ({calib_dir})")
+            out_path = export_path(weights, backend, int8=True)
+            quantize_onnx(path, out_path, images, imgsz)
+            path = out_path
+        return path
+
+    if backend == "openvino":
+        if not int8:
+            return model.export(format="openvino", imgsz=imgsz, dynamic=True)
+
+        # ultralytics INT8 변환은 데이터셋 yaml이 필요하므로 보정 폴더를 가리키는 임시 yaml 작성
+        # (JSON은 YAML로도 읽힘, 라벨은 필요 없음)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_path = os.path.join(tmp_dir, "calib.yaml")
+            calib_abs = os.path.abspath(calib_dir)
+            with open(data_path, 'w', encoding='utf-8') as f:
+                json.dump({'path': calib_abs, 'train': calib_abs, 'val': calib_abs,
+                           'names': model.names}, f)
+            return model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=True, data=data_path)
+
+    raise ValueError(f"Unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+
+
+def load_model(weights="best.pt", backend="torch", imgsz=640, int8=False, calib_dir=CALIB_DIR):
+    """
+    backend로 추론할 YOLO 모델 로드 (run_batch에 그대로 사용 가능).
+    변환 파일이 없거나 weights보다 오래됐으면 먼저 변환.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+    if backend == "torch":
+        return YOLO(weights)
+
+    path = export_path(weights, backend, int8)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(weights):
+        print(f"{backend}{' INT8' if int8 else ''} 모델 변환 중... ({weights} -> {path})")
+        path = export_model(weights, backend, imgsz, int8=int8, calib_dir=calib_dir)
+    return YOLO(path)
+
+
+def warmup(model, imgsz, batch=1, runs=3):
+    """첫 프레임이 느리지 않도록 빈 이미지로 미리 추론 (메모리 할당, 커널 선택 등)"""
+    dummy = [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)] * batch
+    for _ in range(runs):
+        predict(model, dummy, imgsz=imgsz, verbose=False)
+
+
+def compare_detections(expected, actual, iou_threshold=0.5):
+    """
+    같은 이미지의 두 탐지 결과 비교.
+    같은 클래스끼리 IoU가 가장 큰 박스를 짝지어서 (짝이 없는 박스 수, 최대 신뢰도 차이) 반환.
+    """
+    unmatched = 0
+    max_conf_diff = 0.0
+    used = set()
+    for box in expected:
+        candidates = [j for j, other in enumerate(actual) if j not in used and other[5] == box[5]]
+        best = max(candidates, key=lambda j: iou(box[:4], actual[j][:4]), default=None)
+        if best is None or iou(box[:4], actual[best][:4]) < iou_threshold:
+            unmatched += 1
+            continue
+        used.add(best)
+        max_conf_diff = max(max_conf_diff, abs(box[4] - actual[best][4]))
+    return unmatched + len(actual) - len(used), max_conf_diff
+
+
+def check_parity(model, reference, images, imgsz=None, conf=0.25, iou_threshold=0.5,
+                 conf_tolerance=0.05, unmatched_tolerance=0.1):
+    """
+    변환한 모델(model)과 PyTorch 모델(reference)의 결과 비교.
+    짝이 없는 박스 비율이 unmatched_tolerance 이하이고 신뢰도 차이가 conf_tolerance 이하이면 통과.
+    :return: (통과 여부, 결과 설명 문자열)
+    """
+    if not images:
+        return True, "결과 비교 생략 (비교할 이미지 없음)"
+
+    total = 0
+    unmatched = 0
+    max_conf_diff = 0.0
+    elapsed = {'model': 0.0, 'reference': 0.0}
+    for image in images:
+        outputs = {}
+        for name, m in (('model', model), ('reference', reference)):
+            started = time.perf_counter()
+            outputs[name] = run_batch(m, [image], [(0, 0)], conf=conf, imgsz=imgsz)[0]
+            elapsed[name] += time.perf_counter() - started
+
+        image_unmatched, image_diff = compare_detections(outputs['reference'], outputs['model'],
+                                                         iou_threshold)
+        total += max(len(outputs['reference']), len(outputs['model']))
+        unmatched += image_unmatched
+        max_conf_diff = max(max_conf_diff, image_diff)
+
+    unmatched_ratio = unmatched / total if total else 0.0
+    ok = unmatched_ratio <= unmatched_tolerance and max_conf_diff <= conf_tolerance
+    report = (f"결과 비교 {'통과' if ok else '실패'}: 이미지 {len(images)}장, 박스 {total}개, "
+              f"불일치 {unmatched}개 ({unmatched_ratio:.1%}), 최대 신뢰도 차이 {max_conf_diff:.3f}, "
+              f"평균 추론 {elapsed['model'] / len(images) * 1000:.1f}ms "
+              f"(PyTorch {elapsed['reference'] / len(images) * 1000:.1f}ms)")
+    return ok, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 백엔드 변환/검증")
+    parser.add_argument("command", choices=["export", "check"],
+                        help="export: 변환만, check: 변환 후 PyTorch 결과와 비교")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="openvino")
+    parser.add_argument("--int8", action="store_true", help="INT8 양자화")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calib", default=CALIB_DIR, help="INT8 보정/결과 비교 이미지 폴더")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_model(args.weights, args.backend, args.imgsz, int8=args.int8, calib_dir=args.calib)
+        print(f"변환 완료: {path}")
+        return
+
+    model = load_model(args.weights, args.backend, imgsz=args.imgsz, int8=args.int8, calib_dir=args.calib)
+    warmup(model, args.imgsz)
+    reference = YOLO(args.weights)
+    warmup(reference, args.imgsz)
+    ok, report = check_parity(model, reference, load_images(args.calib), imgsz=args.imgsz)
+    print(report)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+오프라인 배치 검사
+
+녹화 영상이나 이미지 폴더를 웹캠/화면 없이 검사하고,
+결과를 대시보드가 읽는 이벤트 저장소(defect_events/)에 기록.
+
+python batch_inspect.py static/
+python batch_inspect.py shift1.mp4 shift2.mp4 --roi 200 150 300 300 --batch 16
+"""
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from event_store import EVENT_DTYPE, EVENT_FILE, EventWriter
+from inference import crop_roi, in_roi, run_batch
+from tracker import BoxTracker
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp'}
+VIDEO_EXTS = {'.mp4', '.avi', '.mov', '.mkv'}
+
+# prefetch 큐 종료 신호
+_DONE = object()
+
+
+def collect_sources(paths):
+    """입력 경로(파일, 폴더, glob 패턴)를 (종류, 경로) 리스트로 펼침"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path))
+        else:
+            files = sorted(glob.glob(path)) or [path]
+
+        for file in files:
+            ext = os.path.splitext(file)[1].lower()
+            if ext in IMAGE_EXTS:
+                sources.append(('image', file))
+            elif ext in VIDEO_EXTS:
+                sources.append(('video', file))
+    return sources
+
+
+def read_images(paths, pool, lookahead):
+    """이미지를 스레드 풀에서 미리 디코딩하면서 순서대로 (경로, 시각, 프레임) 반환"""
+    pending = deque()
+    for path in paths:
+        pending.append((path, pool.submit(cv2.imread, path)))
+        if len(pending) >= lookahead:
+            path, future = pending.popleft()
+            yield path, os.path.getmtime(path), future.result()
+    while pending:
+        path, future = pending.popleft()
+        yield path, os.path.getmtime(path), future.result()
+
+
+def read_video(path, stride):
+    """영상을 stride 프레임 간격으로 (경로, 시각, 프레임) 반환
+    시각은 파일 수정 시각을 녹화 종료 시각으로 보고 프레임 위치로 계산"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    start = os.path.getmtime(path) - frame_count / fps
+
+    index = 0
+    while True:
+        if index % stride == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield path, start + index / fps, frame
+        elif not cap.grab():  # 건너뛸 프레임은 디코딩하지 않음
+            break
+        index += 1
+    cap.release()
+
+
+def iter_frames(sources, args):
+    """모든 입력을 (종류, 경로, 시각, 프레임) 순서로 반환"""
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        images = [path for kind, path in sources if kind == 'image']
+        for path, timestamp, frame in read_images(images, pool, args.workers * 2):
+            if frame is not None:
+                yield 'image', path, timestamp, frame
+
+    for kind, path in sources:
+        if kind == 'video':
+            for path, timestamp, frame in read_video(path, args.stride):
+                yield 'video', path, timestamp, frame
+
+
+def prefetch(iterable, size):
+    """별도 스레드에서 iterable을 미리 읽어서 추론과 디코딩이 겹치도록 함"""
+    buffer = queue.Queue(maxsize=size)
+
+    def produce():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        finally:
+            buffer.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+def batched(iterable, size):
+    """iterable을 size개씩 묶어서 반환"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 폴더/녹화 영상 배치 검사")
+    parser.add_argument("inputs", nargs="+", help="이미지/영상 파일, 폴더 또는 glob 패턴")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--out", default=EVENT_FILE, help="결과를 기록할 이벤트 파일")
+    parser.add_argument("--camera", default="batch", help="이벤트에 기록할 카메라 ID")
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"),
+                        help="ROI만 잘라서 검사 (생략하면 전체 이미지)")
+    parser.add_argument("--imgsz", type=int, default=None, help="모델 입력 크기")
+    parser.add_argument("--conf", type=float, default=0.7)
+    parser.add_argument("--batch", type=int, default=16, help="한 번에 추론할 프레임 수")
+    parser.add_argument("--workers", type=int, default=4, help="이미지 디코딩 스레드 수")
+    parser.add_argument("--stride", type=int, default=1, help="영상에서 N 프레임마다 검사")
+    args = parser.parse_args()
+
+    sources = collect_sources(args.inputs)
+    if not sources:
+        print("검사할 이미지/영상이 없습니다.")
+        return
+
+    model = YOLO(args.model)
+    writer = EventWriter(args.out)
+    roi = tuple(args.roi) if args.roi else None
+
+    # 영상은 추적 ID로 같은 물건을 한 번만 기록 (영상별 추적기)
+    trackers = {}
+    logged_tracks = {}
+
+    frame_total = 0
+    event_total = 0
+    started = time.perf_counter()
+
+    for batch in batched(prefetch(iter_frames(sources, args), args.batch * 2), args.batch):
+        frames = [frame for _, _, _, frame in batch]
+        if roi:
+            inputs = [crop_roi(frame, roi) for frame in frames]
+            offsets = [roi[:2]] * len(frames)
+        else:
+            inputs = frames
+            offsets = [(0, 0)] * len(frames)
+        all_detections = run_batch(model, inputs, offsets, conf=args.conf, imgsz=args.imgsz)
+
+        records = []
+        for (kind, path, timestamp, frame), detections, image, offset in zip(batch, all_detections,
+                                                                            inputs, offsets):
+            if kind == 'video':
+                tracker = trackers.setdefault(path, BoxTracker())
+                logged = logged_tracks.setdefault(path, set())
+                detections = tracker.update(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), offset, detections)
+
+            for x1, y1, x2, y2, conf, tag, track_id in detections:
+                if roi and not in_roi(roi, x1, y1, x2, y2):
+                    continue
+                if track_id is not None:
+                    if track_id in logged:
+                        continue
+                    logged.add(track_id)
+                records.append(writer.make_record(tag, conf, box=(x1, y1, x2, y2),
+                                                  camera=args.camera, timestamp=timestamp))
+
+            if kind == 'video':
+                logged &= tracker.track_ids()
+
+        if records:
+            writer.write_records(np.array(records, dtype=EVENT_DTYPE))
+
+        frame_total += len(batch)
+        event_total += len(records)
+        elapsed = time.perf_counter() - started
+        print(f"\r{frame_total} frames, {event_total} events, {frame_total / elapsed:.1f} FPS", end="")
+
+    writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"\n완료: {frame_total} frames / {elapsed:.1f}s ({frame_total / elapsed:.1f} FPS), "
+          f"{event_total} events -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+인스펙터/대시보드 성능 벤치마크
+
+웹캠, GPU 없이 실행 가능.
+- 인스펙터: 합성 프레임(또는 --video 녹화 영상) + 스텁 모델(또는 --model best.pt)로 단계별 지연 측정
+- 대시보드: 1k ~ 10M 줄 로그를 생성해서 파싱, 집계, 차트 렌더링, /log 응답 시간 측정
+결과는 bench_results/<시각>_<커밋>.json 으로 저장하고 --compare로 이전 결과와 비교.
+
+python benchmark.py
+python benchmark.py --sizes 1000 100000 10000000 --compare bench_results/20260101-120000_abc1234.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+import event_store
+from gate import ChangeGate
+from inference import crop_roi, run_batch
+from display import FrameView
+from tracker import BoxTracker
+
+ROI = (200, 150, 300, 300)
+CLASSES = ['normal', 'tearing', 'contaminated']
+RESULT_DIR = "bench_results"
+
+
+# ======= 스텁 모델 =======
+class StubBox:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = [np.array(xyxy, dtype=np.float32)]
+        self.conf = [np.float32(conf)]
+        self.cls = [np.float32(cls)]
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """
+    YOLO("best.pt") 대신 사용하는 스텁 모델.
+    입력당 latency_ms만큼 기다린 뒤 입력 중앙에 박스 하나를 반환.
+    """
+    names = dict(enumerate(CLASSES))
+
+    def __init__(self, latency_ms=20.0):
+        self.latency = latency_ms / 1000
+
+    def __call__(self, inputs, **kwargs):
+        time.sleep(self.latency * len(inputs))
+        results = []
+        for i, image in enumerate(inputs):
+            h, w = image.shape[:2]
+            box = StubBox([w * 0.3, h * 0.3, w * 0.7, h * 0.7], 0.9, i % len(CLASSES))
+            results.append(StubResult([box]))
+        return results
+
+
+# ======= 측정 =======
+def measure(func, repeat, warmup=1):
+    """func를 repeat번 실행한 시간(초) 리스트"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples, items=1):
+    """지연 백분위수(ms)와 처리량(items/s)"""
+    samples_ms = np.asarray(samples) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 3),
+        'p90_ms': round(float(np.percentile(samples_ms, 90)), 3),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 3),
+        'mean_ms': round(float(samples_ms.mean()), 3),
+        'throughput': round(items * len(samples) / float(np.sum(samples)), 2),
+    }
+
+
+# ======= 프레임 소스 =======
+def synthetic_frames(count, size=(1080, 1920)):
+    """ROI 안에서 움직이는 사각형이 있는 합성 프레임"""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 60, size=(*size, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = ROI[0] + 40 + (i * 3) % 150
+        cv2.rectangle(frame, (x, ROI[1] + 80), (x + 100, ROI[1] + 180), (0, 200, 255), -1)
+        cv2.circle(frame, (x + 50, ROI[1] + 130), 15, (0, 0, 0), -1)
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path, count):
+    """녹화 영상에서 프레임 count개 읽기"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+# ======= 인스펙터 =======
+def bench_inspector(model, frames, repeat):
+    """main.py의 프레임 처리 단계별 지연 측정"""
+    results = {}
+    frame = frames[0]
+    state = {'index': 0}
+
+    def next_frame():
+        state['index'] = (state['index'] + 1) % len(frames)
+        return frames[state['index']]
+
+    results['capture'] = summarize(measure(next_frame, repeat))
+    results['flip'] = summarize(measure(lambda: cv2.flip(frame, 1), repeat))
+
+    gate = ChangeGate()
+    gate.remember(crop_roi(frame, ROI))
+    results['gate'] = summarize(measure(lambda: gate.check(crop_roi(next_frame(), ROI)), repeat))
+
+    roi_offset = [ROI[:2]]
+    results['inference_roi'] = summarize(measure(
+        lambda: run_batch(model, [crop_roi(next_frame(), ROI)], roi_offset, imgsz=320), repeat))
+    results['inference_full'] = summarize(measure(
+        lambda: run_batch(model, [next_frame()], [(0, 0)]), repeat))
+
+    detections = run_batch(model, [crop_roi(frame, ROI)], roi_offset, imgsz=320)[0]
+    tracker = BoxTracker()
+
+    def gray():
+        return cv2.cvtColor(crop_roi(next_frame(), ROI), cv2.COLOR_BGR2GRAY)
+
+    results['tracker_update'] = summarize(measure(lambda: tracker.update(gray(), ROI[:2], detections),
+                                                  repeat))
+    results['tracker_propagate'] = summarize(measure(lambda: tracker.propagate(gray(), ROI[:2]), repeat))
+
+    def overlay():
+        image = frame.copy()
+        cv2.rectangle(image, ROI[:2], (ROI[0] + ROI[2], ROI[1] + ROI[3]), (255, 0, 0), 2)
+        for x1, y1, x2, y2, conf, tag, _ in detections:
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            cv2.putText(image, f"{tag} {conf:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.6, (0, 0, 255), 2)
+        return image
+
+    results['overlay'] = summarize(measure(overlay, repeat))
+
+    try:
+        from PIL import Image
+
+        def to_display():
+            return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+        results['to_rgb_pil'] = summarize(measure(to_display, repeat))
+    except ImportError:
+        pass
+
+    # main.py 표시 경로 (표시 크기로 축소 -> 재사용 버퍼로 RGB 변환, Tk 갱신 제외)
+    view = FrameView(None, max_width=640)
+    results['display_view'] = summarize(measure(lambda: view.to_rgb(view.prepare(frame)), repeat))
+
+    # 전체 파이프라인 (캡처 -> 반전 -> 게이트 -> 추론/추적 -> 오버레이 -> RGB 변환)
+    def pipeline():
+        current = cv2.flip(next_frame(), 1)
+        roi_img = crop_roi(current, ROI)
+        if gate.check(roi_img) == "run":
+            run_batch(model, [roi_img], roi_offset, imgsz=320)
+            gate.remember(roi_img)
+        cv2.rectangle(current, ROI[:2], (ROI[0] + ROI[2], ROI[1] + ROI[3]), (255, 0, 0), 2)
+        cv2.cvtColor(current, cv2.COLOR_BGR2RGB)
+
+    results['pipeline'] = summarize(measure(pipeline, repeat))
+    return results
+
+
+# ======= 로그 생성 =======
+def generate_events(count, days=30, seed=0):
+    """최근 days일에 걸친 이벤트 count개 (시간 순)"""
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    events = np.zeros(count, dtype=event_store.EVENT_DTYPE)
+    events['timestamp'] = np.sort(rng.uniform(now - days * 86400, now, count))
+    events['class_id'] = rng.integers(0, len(CLASSES), count)
+    events['confidence'] = rng.uniform(0.7, 1.0, count)
+    events['x1'], events['y1'] = 250, 200
+    events['x2'], events['y2'] = 350, 300
+    return events
+
+
+def write_text_log(path, events, chunk=1_000_000):
+    """이벤트를 defect_log.txt 형식 텍스트로 저장"""
+    classes = np.asarray(CLASSES, dtype=object)
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, len(events), chunk):
+            part = events[start:start + chunk]
+            stamps = [datetime.fromtimestamp(int(t)).strftime("%Y-%m-%d %H:%M:%S") for t in part['timestamp']]
+            f.writelines(f"{stamp}, {name}({conf:.2f})\n"
+                         for stamp, name, conf in zip(stamps, classes[part['class_id']], part['confidence']))
+
+
+def write_event_log(path, events):
+    """이벤트를 이벤트 저장소 형식(일자별 파티션, 지난 날은 압축)으로 저장"""
+    event_store.save_meta(path, {'record_size': event_store.EVENT_DTYPE.itemsize,
+                                 'classes': CLASSES, 'cameras': ['cam0']})
+    writer = event_store.EventWriter(path)
+    writer.write_records(events)
+    writer.close()
+    os.remove(event_store.rollup_path(path))  # rollup_cold는 롤업 없이 측정
+
+
+# ======= 대시보드 =======
+def bench_dashboard(sizes, repeat):
+    """로그 크기별 대시보드 단계 지연 측정 (임시 폴더에서 실행)"""
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="defect_bench_")
+    try:
+        shutil.copy(os.path.join(source_dir, "dashboard_template.html"), work_dir)
+        os.chdir(work_dir)
+        import flask_app
+        client = flask_app.app.test_client()
+
+        for size in sizes:
+            print(f"  로그 {size:,}줄 생성 중...")
+            events = generate_events(size)
+            prefix = f"log_{size}"
+
+            # 텍스트 로그
+            for name in os.listdir('.'):
+                if os.path.isdir(name) and name.startswith('defect_'):
+                    shutil.rmtree(name)
+                elif name.startswith('defect_'):
+                    os.remove(name)
+            write_text_log(flask_app.LOG_FILE, events)
+            text_repeat = max(1, min(repeat, 20_000_000 // max(size, 1)))
+
+            def parse_cold():
+                flask_app._log_cache.clear()
+                flask_app.parse_defect_data(flask_app.LOG_FILE)
+
+            results[f'{prefix}/parse_text_cold'] = summarize(measure(parse_cold, text_repeat), size)
+            results[f'{prefix}/parse_text_warm'] = summarize(
+                measure(lambda: flask_app.parse_defect_data(flask_app.LOG_FILE), repeat))
+            flask_app._chart_cache.clear()
+            results[f'{prefix}/dashboard_text'] = summarize(measure(lambda: client.get('/log'), text_repeat))
+
+            # 이벤트 저장소
+            write_event_log(flask_app.EVENT_FILE, events)
+            results[f'{prefix}/recent_events'] = summarize(measure(
+                lambda: flask_app.load_recent_defects(flask_app.recent_start(datetime.now()), flask_app.RECENT_LIMIT),
+                repeat))
+            results[f'{prefix}/rollup_cold'] = summarize(
+                measure(lambda: event_store.load_rollup(flask_app.EVENT_FILE), text_repeat), size)
+            event_store.save_rollup(flask_app.EVENT_FILE, event_store.load_rollup(flask_app.EVENT_FILE))
+            results[f'{prefix}/rollup_warm'] = summarize(
+                measure(lambda: event_store.load_rollup(flask_app.EVENT_FILE), repeat))
+            results[f'{prefix}/dashboard_events'] = summarize(measure(lambda: client.get('/log'), repeat))
+
+            # 기간/구간 조회 (인덱스 생성 후)
+            flask_app._index_cache.clear()
+            results[f'{prefix}/query_index_cold'] = summarize(measure(flask_app.get_time_index, 1, warmup=0), size)
+            now = datetime.now()
+            for bucket, span in (('hour', timedelta(days=1)), ('day', timedelta(days=30)), ('shift', timedelta(days=30))):
+                results[f'{prefix}/query_{bucket}'] = summarize(
+                    measure(lambda: flask_app.query_events(now - span, now, bucket), repeat))
+
+            # 차트 렌더링 (캐시 없이)
+            stats = flask_app.filter_recent(flask_app.load_daily_stats(), datetime.now())
+            daily_counts = flask_app.get_daily_counts(stats)
+            for dpi in flask_app.CHART_DPI_CHOICES:
+                for name, renderer in flask_app.CHART_RENDERERS.items():
+                    results[f'{prefix}/chart_{name}_{dpi}dpi'] = summarize(
+                        measure(lambda: renderer(daily_counts, dpi=dpi), max(1, repeat // 10)))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+# ======= 결과 저장/비교 =======
+def git_commit():
+    try:
+        # 다른 폴더에서 실행해도 이 저장소의 커밋을 기록
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results, baseline=None):
+    """결과 표 출력 (baseline이 있으면 p50 변화율 표시)"""
+    print(f"{'stage':45s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s} {'thru/s':>12s}")
+    for name, stats in results.items():
+        line = (f"{name:45s} {stats['p50_ms']:10.3f} {stats['p90_ms']:10.3f} "
+                f"{stats['p99_ms']:10.3f} {stats['throughput']:12.2f}")
+        if baseline and name in baseline and baseline[name]['p50_ms'] > 0:
+            change = (stats['p50_ms'] / baseline[name]['p50_ms'] - 1) * 100
+            line += f"  ({change:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인스펙터/대시보드 성능 벤치마크")
+    parser.add_argument("--only", choices=["inspector", "dashboard"], help="한쪽만 측정")
+    parser.add_argument("--model", help="실제 모델 경로 (생략하면 스텁 모델)")
+    parser.add_argument("--stub-latency", type=float, default=20.0, help="스텁 모델 추론 시간(ms)")
+    parser.add_argument("--video", help="합성 프레임 대신 사용할 녹화 영상")
+    parser.add_argument("--frames", type=int, default=60, help="프레임 소스 크기")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000],
+                        help="생성할 로그 줄 수 (예: 1000 100000 10000000)")
+    parser.add_argument("--repeat", type=int, default=50, help="단계별 반복 횟수")
+    parser.add_argument("--out", default=RESULT_DIR, help="결과 저장 폴더")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    results = {}
+    if args.only != "dashboard":
+        print("인스펙터 측정 중...")
+        if args.model:
+            from ultralytics import YOLO
+            model = YOLO(args.model)
+        else:
+            model = StubModel(args.stub_latency)
+        frames = video_frames(args.video, args.frames) if args.video else synthetic_frames(args.frames)
+        results.update({f'inspector/{k}': v for k, v in bench_inspector(model, frames, args.repeat).items()})
+
+    if args.only != "inspector":
+        print("대시보드 측정 중...")
+        results.update({f'dashboard/{k}': v for k, v in bench_dashboard(args.sizes, args.repeat).items()})
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    commit = git_commit()
+    os.makedirs(args.out, exist_ok=True)
+    out_path = os.path.join(args.out, f"{datetime.now():%Y%m%d-%H%M%S}_{commit}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                   'python': sys.version.split()[0], 'args': vars(args), 'results': results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+대시보드 PNG 차트 렌더링 (Matplotlib 객체 API)
+
+pyplot 전역 상태(plt.figure/savefig/close)를 쓰지 않고 차트마다 Figure를 따로 만들기 때문에
+여러 스레드/프로세스에서 동시에 렌더링해도 안전.
+flask_app은 render_chart()를 프로세스 풀에서 실행 (이 모듈만 import하면 되도록 Flask 의존성 없음).
+"""
+import io
+
+import matplotlib
+from matplotlib.figure import Figure
+
+# 폰트 설정 (프로세스 풀 작업 프로세스에서도 적용되도록 여기서 설정)
+matplotlib.rcParams['font.family'] = ['sans-serif', 'Malgun Gothic']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+CHART_DPI = 150  # 기본 차트 해상도
+
+LABELS = {
+    'tearing': 'tearing (찢어짐)',
+    'contaminated': 'contaminated (오염)',
+    'normal': 'normal (정상)',
+}
+COLORS = {
+    'tearing': "#F39F9F",
+    'contaminated': "#B8AECF",
+    'normal': "#D2F8D1",
+}
+ORDER = ['normal', 'contaminated', 'tearing']  # 스택 순서 (아래부터)
+
+
+def to_png(fig, dpi):
+    """Figure를 PNG 바이트로 저장"""
+    img = io.BytesIO()
+    fig.savefig(img, format='png', dpi=dpi or CHART_DPI, bbox_inches='tight')
+    return img.getvalue()
+
+
+def create_daily_chart(daily_counts, dpi=None):
+    """일별 결함 발생 차트(유형별 스택 막대)를 PNG 바이트로 생성"""
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    columns = ([name for name in ORDER if name in daily_counts.columns]
+               + sorted(name for name in daily_counts.columns if name not in ORDER))
+    positions = range(len(daily_counts.index))
+    bottom = [0] * len(daily_counts.index)
+    for name in columns:
+        counts = daily_counts[name].tolist()
+        bars = ax.bar(positions, counts, width=0.5, bottom=bottom, label=LABELS.get(name, name),
+                      color=COLORS.get(name))
+        # 막대 안에 count 표시 (0이면 표시 안 함)
+        for bar, count in zip(bars, counts):
+            if count > 0:
+                ax.text(bar.get_x() + bar.get_width() / 2, bar.get_y() + count / 2, str(int(count)),
+                        ha='center', va='center', fontsize=10, color='black')
+        bottom = [b + c for b, c in zip(bottom, counts)]
+
+    ax.set_xticks(list(positions))
+    ax.set_xticklabels([str(day) for day in daily_counts.index], rotation=45)
+    ax.set_title('일자별 검사 차트(최근 7일)', fontsize=16, fontweight='bold')
+    ax.set_xlabel('일자', fontsize=12)
+    ax.set_ylabel('검사 수', fontsize=12)
+    ax.legend(title='유형', bbox_to_anchor=(1.05, 1), loc='upper left')
+    fig.tight_layout()
+    return to_png(fig, dpi)
+
+
+def create_defect_type_pie_chart(daily_counts, dpi=None):
+    """결함 타입별 파이 차트를 PNG 바이트로 생성"""
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+
+    defect_counts = daily_counts.sum().sort_values(ascending=False)
+    defect_counts = defect_counts[defect_counts > 0]
+    ax.pie(defect_counts.values, labels=[LABELS.get(name, name) for name in defect_counts.index],
+           autopct='%1.1f%%', colors=[COLORS.get(name, '#CCCCCC') for name in defect_counts.index], startangle=90)
+    ax.set_title('검사 유형별 통계 (최근 7일)', fontsize=16, fontweight='bold')
+    ax.axis('equal')
+    fig.tight_layout()
+    return to_png(fig, dpi)
+
+
+RENDERERS = {
+    'daily': create_daily_chart,
+    'pie': create_defect_type_pie_chart,
+}
+
+
+def render_chart(name, daily_counts, dpi=None):
+    """이름으로 차트 렌더링 (프로세스 풀 작업 함수)"""
+    return RENDERERS[name](daily_counts, dpi=dpi)
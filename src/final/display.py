@@ -0,0 +1,71 @@
+"""
+Tk 영상 표시용 버퍼
+
+매 프레임 RGB 배열, PIL 이미지, PhotoImage를 새로 만들지 않도록
+표시 크기로 먼저 줄인 뒤(축소 -> 오버레이 -> 색 변환) 미리 만들어 둔 버퍼에 덮어쓰고,
+PhotoImage 하나를 paste()로 갱신.
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class FrameView:
+    """
+    카메라 하나의 표시 버퍼.
+    prepare()로 표시 크기 BGR 이미지를 받아 오버레이를 그리고, to_rgb() -> update() 순서로 화면에 반영.
+    오버레이 좌표는 point()로 프레임 좌표 -> 표시 좌표로 변환.
+    """
+
+    def __init__(self, label, max_width=None):
+        self.label = label
+        self.max_width = max_width  # 표시 최대 너비 (None이면 원본 크기)
+        self.size = None            # 표시 크기 (w, h)
+        self.scale = 1.0
+        self.small = None           # 축소한(또는 복사한) BGR 버퍼 (오버레이를 그림)
+        self.rgb = None             # RGB 버퍼
+        self.image = None           # PhotoImage에 붙여넣을 PIL 이미지 (재사용)
+        self.photo = None
+
+    def _allocate(self, size, scale):
+        """표시 크기가 바뀔 때만 버퍼를 새로 만듦"""
+        width, height = size
+        self.size = size
+        self.scale = scale
+        self.small = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.image = Image.new("RGB", size)
+        self.photo = None  # 크기가 바뀌면 PhotoImage도 다시 생성
+
+    def prepare(self, frame):
+        """
+        프레임을 표시 크기로 줄인 BGR 이미지 반환.
+        줄일 필요가 없어도 버퍼에 복사해서 반환 (원본 프레임은 스냅샷 저장 스레드와 공유하므로 그 위에 그리지 않음)
+        """
+        height, width = frame.shape[:2]
+        scale = self.max_width / width if self.max_width and width > self.max_width else 1.0
+        size = (round(width * scale), round(height * scale))
+        if size != self.size:
+            self._allocate(size, scale)
+
+        if self.scale == 1.0:
+            np.copyto(self.small, frame)
+            return self.small
+        return cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_LINEAR)
+
+    def point(self, x, y):
+        """프레임 좌표 -> 표시 좌표"""
+        return int(x * self.scale), int(y * self.scale)
+
+    def to_rgb(self, image):
+        """prepare()로 받은 이미지를 RGB로 변환해서 PIL 이미지에 덮어씀"""
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        self.image.frombytes(self.rgb)
+
+    def update(self):
+        """변환한 이미지를 레이블에 반영 (PhotoImage는 처음 한 번만 생성)"""
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage(image=self.image)
+            self.label.configure(image=self.photo)
+        else:
+            self.photo.paste(self.image)
@@ -0,0 +1,702 @@
+"""
+결함 이벤트 저장소 (고정 길이 바이너리 레코드, 일자/시간별 파티션)
+
+defect_events/ : 파티션 폴더 (EVENT_FILE에서 확장자를 뺀 이름)
+    2026-10-18.bin : 기록 중인 파티션, EVENT_DTYPE 레코드를 이어 붙이기만 함(append-only)
+    2026-10-17.npz : 닫힌 파티션, 시각 순으로 정렬해서 필드별로 압축 (np.savez_compressed)
+    index.json     : 파티션별 파일, 시각 범위(start/end), 레코드 수, 크기
+defect_events.json : 클래스 이름, 카메라 ID 목록 (레코드에는 목록의 인덱스만 저장)
+defect_events_rollup.json : 일자 x 클래스 집계 (기록할 때 함께 갱신)
+
+기간 조회는 index.json의 시각 범위가 겹치는 파티션만 읽고,
+보관 기간(RETENTION_DAYS)이 지났거나 전체 크기가 RETENTION_MAX_BYTES를 넘으면 오래된 파티션부터 삭제.
+예전 단일 파일(defect_events.bin)은 EventWriter를 처음 열 때 파티션으로 옮김.
+
+기존 defect_log.txt 변환 (1회)
+python event_store.py import defect_log.txt
+닫힌 파티션 압축/보관 정책 적용 (인스펙터가 날짜가 바뀔 때 자동으로 실행)
+python event_store.py compact
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 이벤트 파일 경로 (파티션 폴더, 메타/롤업 파일 이름의 기준)
+EVENT_FILE = "defect_events.bin"
+
+# 파티션 단위 ('day' 또는 'hour', 새 저장소를 만들 때만 적용)
+PARTITION_BY = "day"
+PARTITION_SECONDS = {'day': 86400, 'hour': 3600}
+PARTITION_UNITS = {'day': 'D', 'hour': 'h'}
+PARTITION_INDEX = "index.json"
+WRITER_LOCK = "writer.lock"  # 기록기 프로세스 간 잠금 파일 (파티션 폴더 안)
+
+# 보관 정책 (None이면 제한 없음)
+RETENTION_DAYS = 365
+RETENTION_MAX_BYTES = None
+
+# 레코드 형식 (24바이트 고정 길이, 리틀 엔디언)
+EVENT_DTYPE = np.dtype([
+    ('timestamp', '<f8'),    # epoch 초
+    ('class_id', '<u2'),     # meta['classes'] 인덱스
+    ('camera', '<u2'),       # meta['cameras'] 인덱스
+    ('confidence', '<f4'),   # 신뢰도
+    ('x1', '<i2'),           # 박스 좌표 (프레임 기준)
+    ('y1', '<i2'),
+    ('x2', '<i2'),
+    ('y2', '<i2'),
+])
+
+# 텍스트 로그 한 줄 형식 : 날짜, 결함 타입(확률)[, 카메라 ID]
+LOG_PATTERN = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\s*([^(]+)\(([^)]+)\)(?:,\s*(\S+))?'
+
+
+def meta_path(path):
+    """이벤트 파일에 대응하는 메타(JSON) 파일 경로"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def load_meta(path=EVENT_FILE):
+    """메타 파일을 읽어 반환 (없으면 빈 목록)"""
+    try:
+        with open(meta_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'record_size': EVENT_DTYPE.itemsize, 'classes': [], 'cameras': []}
+
+
+def write_json(file_path, data):
+    """JSON을 임시 파일에 쓴 뒤 교체 (읽는 쪽이 깨진 JSON을 보지 않도록)"""
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+
+
+def save_meta(path, meta):
+    """메타 파일 저장"""
+    write_json(meta_path(path), meta)
+
+
+# ======= 파티션 =======
+# 파티션 이름은 로컬 시각 기준 일자(2026-10-18) 또는 시간(2026-10-18T09)
+# index['partitions'][이름] = {'file', 'start', 'end'(레코드 시각 범위, epoch 초), 'count', 'bytes', 'compacted'}
+# index['sequence'] : 지금까지 기록한 전체 레코드 수 (보관 정책으로 지워도 줄지 않음, 예전 단일 파일 이전을 이어서 할 때 사용)
+
+def partition_dir(path):
+    """이벤트 파일에 대응하는 파티션 폴더 경로"""
+    return os.path.splitext(path)[0]
+
+
+def index_path(path):
+    """파티션 색인(JSON) 파일 경로"""
+    return os.path.join(partition_dir(path), PARTITION_INDEX)
+
+
+def load_index(path=EVENT_FILE):
+    """파티션 색인을 읽어 반환 (없으면 빈 색인)"""
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'partition_by': PARTITION_BY, 'sequence': 0, 'partitions': {}}
+
+
+def save_index(path, index):
+    """파티션 색인 저장"""
+    write_json(index_path(path), index)
+
+
+def store_exists(path=EVENT_FILE):
+    """파티션 저장소나 예전 단일 파일이 있는지"""
+    return os.path.exists(index_path(path)) or os.path.isfile(path)
+
+
+def partition_keys(timestamps, partition_by=PARTITION_BY):
+    """epoch 초 배열 -> 로컬 시각 기준 파티션 번호 배열 (1970-01-01부터 센 일/시간 수)"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    local = timestamps + local_offsets(timestamps)
+    return np.floor_divide(local, PARTITION_SECONDS[partition_by]).astype(np.int64)
+
+
+def partition_name(key, partition_by=PARTITION_BY):
+    """파티션 번호 -> 파티션 이름"""
+    return str(np.datetime64(int(key), PARTITION_UNITS[partition_by]))
+
+
+def list_partitions(path=EVENT_FILE, start=None, end=None):
+    """
+    시각 범위가 [start, end) (epoch 초)와 겹치는 파티션 목록 (이름 순).
+    각 항목은 색인 항목에 'name', 'path'를 더한 dict이고, 예전 단일 파일만 있으면 그 파일 하나를 반환.
+    """
+    if not os.path.exists(index_path(path)):
+        if not os.path.isfile(path):
+            return []
+        name = os.path.basename(path)
+        return [{'name': name, 'path': path, 'file': name, 'start': float('-inf'), 'end': float('inf'),
+                 'count': os.path.getsize(path) // EVENT_DTYPE.itemsize, 'compacted': False}]
+
+    index = load_index(path)
+    folder = partition_dir(path)
+    partitions = []
+    for name in sorted(index['partitions']):
+        entry = index['partitions'][name]
+        if (start is not None and entry['end'] < start) or (end is not None and entry['start'] >= end):
+            continue
+        partitions.append(dict(entry, name=name, path=os.path.join(folder, entry['file'])))
+    return partitions
+
+
+def read_partition(partition):
+    """
+    파티션 하나의 레코드 (기록 중인 파티션은 메모리 맵, 압축된 파티션은 풀어서 읽음).
+    색인에 반영된 레코드 수까지만 반환.
+    """
+    path = partition['path']
+    if not os.path.exists(path):
+        # 목록을 읽은 뒤 압축되었거나(.bin -> .npz) 다시 열린(.npz -> .bin) 파티션
+        root, ext = os.path.splitext(path)
+        path = root + (".npz" if ext == ".bin" else ".bin")
+
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            events = np.empty(len(data['timestamp']), dtype=EVENT_DTYPE)
+            for field in EVENT_DTYPE.names:
+                events[field] = data[field]
+        return events[:partition['count']]
+
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    # 기록 중인 마지막 레코드가 잘려 있거나 색인에 아직 반영되지 않았을 수 있으므로 색인의 레코드 수까지만 사용
+    count = min(size // EVENT_DTYPE.itemsize, partition['count'])
+    if count == 0:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return np.memmap(path, dtype=EVENT_DTYPE, mode='r', shape=(count,))
+
+
+def compact_partition(path, index, name):
+    """
+    닫힌 파티션을 시각 순으로 정렬해서 필드별로 압축(.npz)하고 색인 갱신.
+    새 파일과 색인을 저장한 뒤 원본을 지우므로 읽는 쪽은 항상 둘 중 하나를 읽을 수 있음.
+    """
+    entry = index['partitions'][name]
+    folder = partition_dir(path)
+    source = os.path.join(folder, entry['file'])
+    events = read_partition(dict(entry, path=source))
+    events = np.asarray(events)[np.argsort(events['timestamp'], kind='stable')]
+
+    target = os.path.join(folder, f"{name}.npz")
+    with open(target + ".tmp", 'wb') as f:
+        np.savez_compressed(f, **{field: events[field] for field in EVENT_DTYPE.names})
+    os.replace(target + ".tmp", target)
+    entry.update(file=os.path.basename(target), count=len(events), bytes=os.path.getsize(target), compacted=True)
+    save_index(path, index)
+
+    if source != target:
+        try:
+            os.remove(source)
+        except OSError:
+            pass  # (Windows) 대시보드가 읽는 중이면 다음 정리 때 삭제
+
+
+# ======= 롤업 (일자 x 클래스 집계) =======
+# 이벤트를 기록할 때 함께 갱신해서 대시보드가 원본 레코드를 다시 집계하지 않도록 함
+# rollup['days'][일자][클래스] = [건수, 신뢰도 합, 최소 신뢰도, 최대 신뢰도]
+# rollup['partitions'][파티션] : 롤업에 반영된 레코드 수 (그 뒤 레코드는 불러올 때 따라잡음)
+
+def rollup_path(path):
+    """이벤트 파일에 대응하는 롤업(JSON) 파일 경로"""
+    return os.path.splitext(path)[0] + "_rollup.json"
+
+
+def local_offsets(timestamps):
+    """epoch 초 배열의 로컬 시간대 오프셋(초) 배열 (서머타임 반영)"""
+    # 같은 15분 구간 안에서는 오프셋이 바뀌지 않으므로 고유한 구간만 계산
+    quarters, inverse = np.unique(np.floor_divide(timestamps, 900).astype(np.int64), return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(q) * 900).astimezone().utcoffset().total_seconds()
+                        for q in quarters])
+    return offsets[inverse]
+
+
+def local_days(timestamps):
+    """epoch 초 배열을 로컬 날짜 문자열(YYYY-MM-DD) 배열로 변환"""
+    local = (np.asarray(timestamps) + local_offsets(timestamps)).astype('datetime64[s]')
+    return np.datetime_as_string(local.astype('datetime64[D]')).astype(object)
+
+
+def add_to_rollup(rollup, events, meta):
+    """레코드 배열을 일자 x 클래스로 묶어서 롤업에 더함"""
+    if len(events) == 0:
+        return
+
+    day_names, day_index = np.unique(local_days(events['timestamp']), return_inverse=True)
+    class_count = max(len(meta['classes']), 1)
+    keys, inverse = np.unique(day_index * class_count + events['class_id'], return_inverse=True)
+
+    confidence = events['confidence'].astype(np.float64)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=confidence)
+    mins = np.full(len(keys), np.inf)
+    maxs = np.full(len(keys), -np.inf)
+    np.minimum.at(mins, inverse, confidence)
+    np.maximum.at(maxs, inverse, confidence)
+
+    for key, count, conf_sum, conf_min, conf_max in zip(keys, counts, sums, mins, maxs):
+        day = day_names[key // class_count]
+        class_name = meta['classes'][key % class_count]
+        stats = rollup['days'].setdefault(day, {}).get(class_name)
+        if stats is None:
+            rollup['days'][day][class_name] = [int(count), float(conf_sum), float(conf_min), float(conf_max)]
+        else:
+            stats[0] += int(count)
+            stats[1] += float(conf_sum)
+            stats[2] = min(stats[2], float(conf_min))
+            stats[3] = max(stats[3], float(conf_max))
+
+
+def load_rollup(path=EVENT_FILE):
+    """
+    롤업 파일을 읽고, 롤업 이후에 기록된 레코드가 있으면 파티션별로 반영해서 반환.
+    롤업에 있는 파티션이 없어졌거나 레코드 수가 줄었으면(교체/초기화/이전) 처음부터 다시 집계.
+    """
+    try:
+        with open(rollup_path(path), 'r', encoding='utf-8') as f:
+            rollup = json.load(f)
+    except FileNotFoundError:
+        rollup = {'partitions': {}, 'days': {}}
+    if 'partitions' not in rollup:
+        # 예전 형식 (단일 파일에 반영된 레코드 수)
+        rollup = {'partitions': {os.path.basename(path): rollup['event_count']}, 'days': rollup['days']}
+
+    meta = load_meta(path)
+    partitions = list_partitions(path)
+    counts = {partition['name']: partition['count'] for partition in partitions}
+    if any(counts.get(name, -1) < applied for name, applied in rollup['partitions'].items()):
+        rollup = {'partitions': {}, 'days': {}}
+
+    for partition in partitions:
+        applied = rollup['partitions'].get(partition['name'], 0)
+        if applied < partition['count']:
+            add_to_rollup(rollup, read_partition(partition)[applied:], meta)
+            rollup['partitions'][partition['name']] = partition['count']
+    return rollup
+
+
+def save_rollup(path, rollup):
+    """롤업 파일 저장"""
+    write_json(rollup_path(path), rollup)
+
+
+def file_stamp(path):
+    """파일이 교체/수정되었는지 비교할 값 (없으면 None)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class StoreLock:
+    """
+    저장소 하나의 프로세스 간 잠금 (with 블록 동안 다른 기록기는 대기).
+    인스펙터와 배치 검사가 같은 저장소에 기록해도 메타/색인/롤업을 서로 덮어쓰지 않도록 함.
+    """
+
+    def __init__(self, path=EVENT_FILE):
+        self.file = open(os.path.join(partition_dir(path), WRITER_LOCK), 'a+b')
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK은 10초 동안 얻지 못하면 실패하므로 다시 시도
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        self.file.close()
+
+
+class EventWriter:
+    """
+    이벤트 기록기 (인스펙터, 배치 검사).
+    레코드를 시각에 맞는 파티션 파일에 이어 붙이고(마지막으로 쓴 파티션 파일은 열어 둠), 색인과 롤업도 함께 갱신.
+    파티션이 바뀌면(날짜 변경) 지난 파티션을 압축하고 보관 정책을 적용.
+    여러 프로세스가 같은 저장소에 기록할 수 있도록 기록/정리는 StoreLock 안에서 하고,
+    다른 기록기가 색인을 바꿨으면 메타/색인/롤업을 다시 읽은 뒤 기록.
+    """
+
+    def __init__(self, path=EVENT_FILE, retention_days=RETENTION_DAYS, max_bytes=RETENTION_MAX_BYTES):
+        self.path = path
+        self.folder = partition_dir(path)
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.meta = load_meta(path)
+        self.file = None        # 열어 둔 파티션 파일
+        self.file_name = None   # 그 파티션 이름
+        self.current = None     # 현재 시각의 파티션 이름 (이보다 앞선 파티션은 닫힌 파티션)
+
+        self.index_stamp = None  # 마지막으로 읽거나 저장한 색인 파일 상태
+
+        os.makedirs(self.folder, exist_ok=True)
+        self.lock = StoreLock(path)
+        with self._locked():
+            if os.path.isfile(path):
+                self._migrate()
+                self.rollup = load_rollup(path)  # 예전 단일 파일 기준 롤업 -> 파티션 기준으로 다시 집계
+            save_index(path, self.index)
+            save_rollup(path, self.rollup)
+            self._maintain()
+
+    @contextmanager
+    def _locked(self):
+        """잠금을 얻고, 다른 기록기가 색인을 바꿨으면 메타/색인/롤업을 다시 읽음"""
+        with self.lock:
+            stamp = file_stamp(index_path(self.path))
+            if self.index_stamp is None or stamp != self.index_stamp:
+                self._close_file()  # 다른 기록기가 압축/삭제했을 수 있음
+                self.meta = load_meta(self.path)
+                self.index = load_index(self.path)
+                self.partition_by = self.index['partition_by']
+                self.rollup = load_rollup(self.path)
+            yield
+            self.index_stamp = file_stamp(index_path(self.path))
+
+    def _migrate(self, chunk=1_000_000):
+        """예전 단일 파일을 파티션으로 옮기고 삭제"""
+        count = os.path.getsize(self.path) // EVENT_DTYPE.itemsize
+        if count:
+            events = np.memmap(self.path, dtype=EVENT_DTYPE, mode='r', shape=(count,))
+            # 옮기던 중 종료되었으면 이미 옮긴 레코드(sequence)는 건너뜀
+            for offset in range(self.index['sequence'], count, chunk):
+                self._append(np.asarray(events[offset:offset + chunk]))
+            del events
+        self._close_file()
+        os.remove(self.path)
+
+    def _lookup_id(self, key, name):
+        """이름을 메타 목록의 인덱스로 변환 (처음 보는 이름이면 목록에 추가)"""
+        if name not in self.meta[key]:
+            # 목록은 뒤에 추가만 하므로 잠금 안에서 다시 읽고 추가하면 다른 기록기가 준 인덱스와 겹치지 않음
+            with self.lock:
+                self.meta = load_meta(self.path)
+                if name not in self.meta[key]:
+                    self.meta[key].append(name)
+                    # 레코드보다 메타를 먼저 저장해야 읽는 쪽에서 모르는 인덱스가 생기지 않음
+                    save_meta(self.path, self.meta)
+        return self.meta[key].index(name)
+
+    def make_record(self, class_name, confidence, box=(0, 0, 0, 0), camera='cam0', timestamp=None):
+        """이벤트 하나를 EVENT_DTYPE 레코드로 변환"""
+        record = np.zeros((), dtype=EVENT_DTYPE)
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        record['class_id'] = self._lookup_id('classes', class_name)
+        record['camera'] = self._lookup_id('cameras', camera)
+        record['confidence'] = confidence
+        record['x1'], record['y1'], record['x2'], record['y2'] = box
+        return record
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = self.file_name = None
+
+    def _open(self, name, entry):
+        """파티션 파일을 이어 쓰기로 열기 (색인에 반영되지 않은 꼬리는 잘라냄)"""
+        if self.file_name == name:
+            return self.file
+        self._close_file()
+        if entry['compacted']:
+            # 닫힌 파티션에 늦게 도착한 레코드 (배치 검사, 가져오기 등): 풀어서 다시 기록 중 상태로 (.npz는 정리 때 삭제)
+            events = read_partition(dict(entry, path=os.path.join(self.folder, entry['file'])))
+            with open(os.path.join(self.folder, f"{name}.bin"), 'wb') as f:
+                f.write(events.tobytes())
+            entry.update(file=f"{name}.bin", compacted=False)
+        self.file = open(os.path.join(self.folder, entry['file']), 'ab')
+        self.file.truncate(entry['count'] * EVENT_DTYPE.itemsize)
+        self.file_name = name
+        return self.file
+
+    def _append(self, records):
+        """레코드를 파티션별로 나눠 쓰고 색인 저장, 쓴 파티션 이름 목록 반환"""
+        keys = partition_keys(records['timestamp'], self.partition_by)
+        names = []
+        for key in np.unique(keys):
+            name = partition_name(key, self.partition_by)
+            names.append(name)
+            part = records if keys[0] == keys[-1] == key else records[keys == key]
+            entry = self.index['partitions'].setdefault(name, {
+                'file': f"{name}.bin", 'start': float('inf'), 'end': float('-inf'),
+                'count': 0, 'bytes': 0, 'compacted': False})
+            file = self._open(name, entry)
+            file.write(part.tobytes())
+            file.flush()
+            entry['start'] = min(entry['start'], float(part['timestamp'].min()))
+            entry['end'] = max(entry['end'], float(part['timestamp'].max()))
+            entry['count'] += len(part)
+            entry['bytes'] = entry['count'] * EVENT_DTYPE.itemsize
+        self.index['sequence'] += len(records)
+        save_index(self.path, self.index)
+        return names
+
+    def write_records(self, records):
+        """레코드 배열을 파티션에 쓰고 롤업에 반영 (파티션이 바뀌었으면 지난 파티션 정리)"""
+        if len(records) == 0:
+            return
+        with self._locked():
+            names = self._append(records)
+            add_to_rollup(self.rollup, records, self.meta)
+            for name in names:
+                self.rollup['partitions'][name] = self.index['partitions'][name]['count']
+            save_rollup(self.path, self.rollup)
+
+            if partition_name(partition_keys([time.time()], self.partition_by)[0], self.partition_by) != self.current:
+                self._maintain()
+
+    def append(self, class_name, confidence, box=(0, 0, 0, 0), camera='cam0', timestamp=None):
+        """이벤트 하나를 기록"""
+        record = self.make_record(class_name, confidence, box, camera, timestamp)
+        self.write_records(record.reshape(1))
+
+    def maintain(self, now=None):
+        """지난 파티션 압축, 보관 정책 적용, 색인에 없는 파일 정리"""
+        with self._locked():
+            self._maintain(now)
+
+    def _maintain(self, now=None):
+        now = time.time() if now is None else now
+        self.current = partition_name(partition_keys([now], self.partition_by)[0], self.partition_by)
+        if self.file_name is not None and self.file_name < self.current:
+            self._close_file()
+
+        for name, entry in sorted(self.index['partitions'].items()):
+            if name < self.current and not entry['compacted']:
+                compact_partition(self.path, self.index, name)
+        self._apply_retention(now)
+
+        files = {entry['file'] for entry in self.index['partitions'].values()} | {PARTITION_INDEX}
+        for file_name in os.listdir(self.folder):
+            if file_name not in files and file_name.endswith((".bin", ".npz", ".npz.tmp")):
+                try:
+                    os.remove(os.path.join(self.folder, file_name))
+                except OSError:
+                    pass
+
+    def _apply_retention(self, now):
+        """보관 기간이 지났거나 전체 크기가 max_bytes를 넘는 만큼 오래된 파티션부터 삭제"""
+        partitions = self.index['partitions']
+        expired = []
+        if self.retention_days is not None:
+            cutoff = now - self.retention_days * 86400
+            expired = [name for name in sorted(partitions)
+                       if partitions[name]['end'] < cutoff and name < self.current]
+        if self.max_bytes is not None:
+            total = sum(entry['bytes'] for name, entry in partitions.items() if name not in expired)
+            for name in sorted(partitions):
+                if total <= self.max_bytes or name >= self.current:
+                    break
+                if name not in expired:
+                    expired.append(name)
+                    total -= partitions[name]['bytes']
+        if not expired:
+            return
+
+        files = [partitions.pop(name)['file'] for name in expired]
+        save_index(self.path, self.index)
+        for file_name in files:
+            try:
+                os.remove(os.path.join(self.folder, file_name))
+            except OSError:
+                pass  # 다음 정리 때 삭제
+
+        # 롤업도 남은 파티션의 첫 날 이전은 삭제 (일 단위이므로 시간별 파티션이 일부만 지워진 날은 그대로 둠)
+        for name in expired:
+            self.rollup['partitions'].pop(name, None)
+        first_day = min(partitions)[:10] if partitions else self.current[:10]
+        for day in [day for day in self.rollup['days'] if day < first_day]:
+            del self.rollup['days'][day]
+        save_rollup(self.path, self.rollup)
+
+    def close(self):
+        """파일을 닫고 지난 파티션 정리"""
+        self.maintain()
+        self._close_file()
+        self.lock.close()
+
+
+# AsyncEventWriter 종료 신호
+_STOP = object()
+
+
+class AsyncEventWriter:
+    """
+    백그라운드 스레드에서 이벤트를 모아서 기록하는 기록기.
+    append()는 큐에 넣기만 하므로 호출한 스레드(UI/추론)를 막지 않음.
+    batch_size개가 모이거나 첫 이벤트 후 flush_interval초가 지나면 한 번에 기록.
+    """
+
+    def __init__(self, path=EVENT_FILE, batch_size=64, flush_interval=1.0):
+        self.writer = EventWriter(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def append(self, class_name, confidence, box=(0, 0, 0, 0), camera='cam0', timestamp=None):
+        """이벤트를 기록 대기열에 추가"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.queue.put((class_name, confidence, box, camera, timestamp))
+
+    def _run(self):
+        records = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # flush_interval 경과
+
+            if item is not None and item is not _STOP:
+                records.append(self.writer.make_record(*item))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(records) < self.batch_size:
+                    continue
+
+            # 배치가 찼거나, 시간이 지났거나, 종료 요청
+            if records:
+                try:
+                    self.writer.write_records(np.array(records, dtype=EVENT_DTYPE))
+                except Exception as e:
+                    # 배치 하나가 실패해도 스레드는 계속 실행 (이후 이벤트까지 잃지 않도록)
+                    print(f"Error writing events: {e!r}")
+                records = []
+            deadline = None
+
+            if item is _STOP:
+                break
+
+    def close(self):
+        """남은 이벤트를 모두 기록하고 종료"""
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.writer.close()
+
+
+def read_tail(path=EVENT_FILE, count=10):
+    """가장 최근 파티션부터 거슬러 올라가며 마지막 count개 레코드만 읽어 반환 (기록 순서)"""
+    parts, remaining = [], count
+    for partition in reversed(list_partitions(path)):
+        if remaining <= 0:
+            break
+        events = read_partition(partition)[-remaining:]
+        if len(events):
+            parts.append(events)
+            remaining -= len(events)
+    if not parts:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
+
+
+def tail_position(path=EVENT_FILE):
+    """실시간 스트림 위치: 가장 최근 파티션의 (이름, 레코드 수), 저장소가 비어 있으면 ('', 0)"""
+    partitions = list_partitions(path)
+    return (partitions[-1]['name'], partitions[-1]['count']) if partitions else ('', 0)
+
+
+def read_since(path=EVENT_FILE, position=None, limit=50):
+    """
+    position(tail_position()) 이후 가장 최근 파티션에 추가된 레코드 중 마지막 limit개와 새 position.
+    예전 파티션에 늦게 추가된 레코드(배치 검사, 가져오기)는 실시간 이벤트가 아니므로 포함하지 않고,
+    가장 최근 파티션이 바뀌었으면(날짜 변경) 새 파티션의 처음부터 읽음.
+    """
+    partitions = list_partitions(path)
+    if not partitions:
+        return np.empty(0, dtype=EVENT_DTYPE), ('', 0)
+    newest = partitions[-1]
+    name, offset = position if position is not None else ('', 0)
+    if name != newest['name'] or offset > newest['count']:
+        offset = 0
+    start = max(offset, newest['count'] - limit)
+    if start >= newest['count']:
+        return np.empty(0, dtype=EVENT_DTYPE), (newest['name'], newest['count'])
+    # 압축 후 다시 열린 파티션도 새 레코드는 기존 레코드 뒤에 이어 붙이므로 위치가 유지됨
+    return np.asarray(read_partition(newest)[start:]), (newest['name'], newest['count'])
+
+
+def import_text_log(text_path, path=EVENT_FILE):
+    """
+    기존 텍스트 로그(defect_log.txt)를 이벤트 저장소로 변환 (1회용, 닫힌 파티션은 바로 압축).
+    박스 좌표는 텍스트 로그에 없으므로 0으로 저장.
+    :return: 변환한 이벤트 수
+    """
+    writer = EventWriter(path)
+    records = []
+    with open(text_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = re.match(LOG_PATTERN, line.strip())
+            if not match:
+                continue
+            timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").timestamp()
+            records.append(writer.make_record(match.group(2).strip(), float(match.group(3)),
+                                              camera=match.group(4) or 'cam0', timestamp=timestamp))
+
+    if records:
+        writer.write_records(np.array(records, dtype=EVENT_DTYPE))
+    writer.close()
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="결함 이벤트 저장소 도구")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="텍스트 로그를 이벤트 파일로 변환")
+    import_parser.add_argument("text_log", nargs="?", default="defect_log.txt")
+    import_parser.add_argument("--out", default=EVENT_FILE)
+
+    compact_parser = subparsers.add_parser("compact", help="예전 단일 파일 이전, 닫힌 파티션 압축, 보관 정책 적용")
+    compact_parser.add_argument("--path", default=EVENT_FILE)
+    compact_parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    compact_parser.add_argument("--max-bytes", type=int, default=RETENTION_MAX_BYTES)
+
+    args = parser.parse_args()
+    if args.command == "import":
+        count = import_text_log(args.text_log, args.out)
+        print(f"{count}개 이벤트 변환 완료 -> {args.out}")
+    elif args.command == "compact":
+        EventWriter(args.path, retention_days=args.retention_days, max_bytes=args.max_bytes).close()
+        partitions = list_partitions(args.path)
+        print(f"파티션 {len(partitions)}개, {sum(p['count'] for p in partitions):,}건, "
+              f"{sum(p['bytes'] for p in partitions) / 1024 ** 2:.1f}MB -> {partition_dir(args.path)}")
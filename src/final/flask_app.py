@@ -1,176 +1,874 @@
-from flask import Flask, render_template_string
+from flask import Flask, render_template_string, request, url_for, Response, abort, jsonify, send_file
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-from datetime import datetime, timedelta
+import matplotlib
+# 화면 없이 PNG만 렌더링 (검사 프로그램 안에서 스레드로 실행될 때 Tk와 충돌하지 않도록)
+matplotlib.use('Agg')
+import multiprocessing
+import json
 import re
+import time
+from datetime import datetime, timedelta
+import argparse
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import charts
+import event_store
+import frame_share
+import metrics
+import snapshot_store
+from metrics import timed
 
 app = Flask(__name__)
 
-# 폰트 설정
-plt.rcParams['font.family'] = ['sans-serif', 'Malgun Gothic']
-plt.rcParams['axes.unicode_minus'] = False
+# 로그 파일 경로
+# 이벤트 저장소(defect_events/)가 있으면 그것을, 없으면 예전 텍스트 로그를 읽음
+LOG_FILE = "defect_log.txt"
+EVENT_FILE = event_store.EVENT_FILE
+
+# 텍스트 로그 한 줄 형식 : 날짜, 결함 타입(확률)[, 카메라 ID]
+# 카메라 ID가 없는 예전 로그는 cam0으로 간주
+LOG_PATTERN = event_store.LOG_PATTERN
+LOG_COLUMNS = ['timestamp', 'defect_type', 'confidence', 'camera']
+
+# 로그 파일별 증분 파싱 캐시
+# inode: 파일 식별자, size: 마지막으로 본 파일 크기, offset: 파싱을 마친 바이트 위치, df: 누적 DataFrame
+_log_cache = {}
+_log_lock = threading.Lock()
+
+def parse_log_lines(lines):
+    """로그 줄 리스트를 한 번에(벡터화) 파싱하여 DataFrame으로 반환"""
+    lines = pd.Series(lines, dtype=object).str.strip()
+    parsed = lines.str.extract(LOG_PATTERN).dropna(subset=[0, 1, 2])
+
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(parsed[0], format='%Y-%m-%d %H:%M:%S'),
+        'defect_type': parsed[1].str.strip(),
+        'confidence': pd.to_numeric(parsed[2], errors='coerce'),
+        'camera': parsed[3].fillna('cam0')
+    }, columns=LOG_COLUMNS)
+    return df.dropna(subset=['confidence']).reset_index(drop=True)
 
 def parse_defect_data(file_path):
-    """defect_log.txt 파일을 파싱하여 DataFrame으로 반환"""
+    """
+    defect_log.txt 파일을 파싱하여 DataFrame으로 반환.
+    이전 호출 이후 파일 끝에 추가된 줄만 파싱해서 캐시된 DataFrame에 이어 붙이고,
+    파일이 잘리거나(크기 감소) 교체(inode 변경)되면 처음부터 다시 읽음.
+    반환된 DataFrame은 캐시와 공유되므로 수정하지 말고 .copy()해서 사용.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        data = []
-        for line in lines:
-            line = line.strip()
-            if line:
-                # 날짜, 결함 타입(확률) 형식 파싱
-                match = re.match(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\s*([^(]+)\(([^)]+)\)', line)
-                if match:
-                    timestamp = match.group(1)
-                    defect_type = match.group(2).strip()
-                    confidence = float(match.group(3))
-                    data.append({
-                        'timestamp': pd.to_datetime(timestamp),
-                        'defect_type': defect_type,
-                        'confidence': confidence
-                    })
-        
-        return pd.DataFrame(data)
+        with _log_lock:
+            stat = os.stat(file_path)
+            cache = _log_cache.get(file_path)
+
+            if cache is None or cache['inode'] != stat.st_ino or stat.st_size < cache['offset']:
+                cache = {'inode': stat.st_ino, 'size': 0, 'offset': 0,
+                         'df': pd.DataFrame(columns=LOG_COLUMNS)}
+                _log_cache[file_path] = cache
+
+            if stat.st_size > cache['offset']:
+                with open(file_path, 'rb') as file:
+                    file.seek(cache['offset'])
+                    chunk = file.read(stat.st_size - cache['offset'])
+
+                # 마지막 줄은 아직 쓰는 중일 수 있으므로 마지막 개행까지만 파싱
+                end = chunk.rfind(b'\n') + 1
+                if end > 0:
+                    new_df = parse_log_lines(chunk[:end].decode('utf-8').splitlines())
+                    if not new_df.empty:
+                        if cache['df'].empty:
+                            cache['df'] = new_df
+                        else:
+                            cache['df'] = pd.concat([cache['df'], new_df], ignore_index=True)
+                    cache['offset'] += end
+
+            cache['size'] = stat.st_size
+            return cache['df']
     except Exception as e:
         print(f"Error parsing file: {e}")
         return pd.DataFrame()
 
-def create_daily_chart(df):
-    """일별 결함 발생 차트 생성"""
-    plt.figure(figsize=(12, 6))
-    
-    # 일별 결함 타입별 집계
-    daily_defects = df.groupby([df['timestamp'].dt.date, 'defect_type']).size().unstack(fill_value=0)
-
-    label_map = {
-        'tearing': 'tearing (찢어짐)',
-        'contaminated': 'contaminated (오염)',
-        'normal': 'normal (정상)',
-    }
-    color_map = {
-        'tearing (찢어짐)': "#F39F9F",       
-        'contaminated (오염)': "#B8AECF",    
-        'normal (정상)': "#D2F8D1"          
-    }
-    daily_defects = daily_defects.rename(columns=label_map)
-
-    # 컬럼 순서 변경
-    desired_order = ['normal (정상)', 'contaminated (오염)', 'tearing (찢어짐)']
-    daily_defects = daily_defects[desired_order]
-    
-    # 스택 바 차트
-    ax = daily_defects.plot(kind='bar', stacked=True, figsize=(12, 6), color=[color_map[col] for col in daily_defects.columns])
-    # 막대 안에 count 표시
-    for container in ax.containers:
-        for bar in container:
-            height = bar.get_height()
-            if height > 0:  # 0이면 표시 안 함
-                ax.text(
-                    bar.get_x() + bar.get_width()/2,  # 막대 중앙
-                    bar.get_y() + height/2,           # 스택 중앙
-                    str(int(height)),                  # 텍스트
-                    ha='center', va='center', fontsize=10, color='black'
-                )
-
-    plt.title('일자별 검사 차트(최근 7일)', fontsize=16, fontweight='bold')
-    plt.xlabel('일자', fontsize=12)
-    plt.ylabel('검사 수', fontsize=12)
-    plt.legend(title='유형', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    
-    # 이미지를 base64로 인코딩
-    img = io.BytesIO()
-    plt.savefig(img, format='png', dpi=300, bbox_inches='tight')
-    img.seek(0)
-    plot_url = base64.b64encode(img.getvalue()).decode()
-    plt.close()
-    
-    return plot_url
-
-def create_defect_type_pie_chart(df):
-    """결함 타입별 파이 차트 생성"""
-    plt.figure(figsize=(8, 8))
-    
-    defect_counts = df['defect_type'].value_counts()
-    # colors = plt.cm.Set3(range(len(defect_counts)))
-
-    label_map = {
-        'tearing': 'tearing (찢어짐)',
-        'contaminated': 'contaminated (오염)',
-        'normal': 'normal (정상)',
+# 롤업(일자 x 클래스 집계) 컬럼
+ROLLUP_COLUMNS = ['day', 'defect_type', 'count', 'conf_sum', 'conf_min', 'conf_max']
+
+def events_to_frame(events, meta):
+    """이벤트 레코드 배열을 텍스트 로그와 같은 컬럼의 DataFrame으로 변환"""
+    if len(events) == 0:
+        return pd.DataFrame()
+
+    # 문자열/날짜 파싱 없이 배열 단위로 변환
+    classes = np.asarray(meta['classes'], dtype=object)
+    cameras = np.asarray(meta['cameras'], dtype=object)
+    timestamps = events['timestamp'] + event_store.local_offsets(events['timestamp'])
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamps, unit='s'),
+        'defect_type': classes[events['class_id']],
+        'confidence': events['confidence'].astype(float),
+        'camera': cameras[events['camera']]
+    }, columns=LOG_COLUMNS)
+
+def get_data_source():
+    """대시보드가 읽을 파일 경로 (이벤트 저장소 우선)"""
+    return EVENT_FILE if event_store.store_exists(EVENT_FILE) else LOG_FILE
+
+def load_daily_stats():
+    """
+    일자 x 클래스 집계를 DataFrame(ROLLUP_COLUMNS)으로 반환.
+    이벤트 저장소는 기록 시 갱신된 롤업을 그대로 사용하고, 텍스트 로그는 여기서 집계.
+    """
+    file_path = get_data_source()
+    if file_path == EVENT_FILE:
+        rollup = event_store.load_rollup(file_path)
+        rows = [(day, defect_type, *values)
+                for day, classes in rollup['days'].items()
+                for defect_type, values in classes.items()]
+        stats = pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+        stats['day'] = pd.to_datetime(stats['day'], format='%Y-%m-%d').dt.date
+        return stats
+
+    df = parse_defect_data(file_path)
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    stats = df.groupby([df['timestamp'].dt.date, 'defect_type'])['confidence'].agg(
+        ['count', 'sum', 'min', 'max'])
+    stats = stats.reset_index()
+    stats.columns = ROLLUP_COLUMNS
+    return stats
+
+def load_recent_defects(since, limit=10):
+    """since 이후 가장 최근 결함 limit개 반환"""
+    file_path = get_data_source()
+    if file_path == EVENT_FILE:
+        # 레코드는 시간 순서로 쌓이므로 최근 파티션의 끝부분만 읽음
+        df = events_to_frame(np.asarray(event_store.read_tail(file_path, limit)), event_store.load_meta(file_path))
+    else:
+        df = parse_defect_data(file_path)
+    if df.empty:
+        return df
+    df = df[df['timestamp'] >= since]
+    return df.sort_values('timestamp', ascending=False).head(limit)
+
+def get_daily_counts(stats):
+    """집계를 일자(행) x 클래스(열) 건수 표로 변환"""
+    return stats.pivot_table(index='day', columns='defect_type', values='count',
+                             aggfunc='sum', fill_value=0)
+
+# ======= 차트 캐시 =======
+# 같은 데이터 버전, 같은 해상도의 차트는 한 번만 렌더링하고 재사용
+# 캐시가 가득 차면 가장 오래 사용하지 않은 차트부터 삭제(LRU)
+# 렌더링은 charts.py(Figure 객체 API)를 프로세스 풀에서 실행해서 여러 차트를 동시에 그리고,
+# 같은 차트를 동시에 요청하면 먼저 온 요청의 렌더링 결과를 같이 기다림 (한 번만 렌더링)
+CHART_DPI = charts.CHART_DPI         # 기본 차트 해상도
+CHART_DPI_CHOICES = (72, 150, 300)   # 선택 가능한 해상도 (?dpi=)
+CHART_CACHE_SIZE = 16                # 캐시할 최대 차트 수
+CHART_RENDERERS = charts.RENDERERS
+# 렌더링 프로세스 수 (환경 변수 DASHBOARD_CHART_PROCESSES로 변경, 0이면 프로세스 대신 스레드 2개)
+CHART_PROCESSES = int(os.environ.get('DASHBOARD_CHART_PROCESSES', min(os.cpu_count() or 1, 4)))
+
+_chart_cache = OrderedDict()
+_chart_pending = {}   # 렌더링 중인 차트 키 -> Future
+_chart_lock = threading.Lock()
+_chart_executor = None
+
+def get_chart_executor():
+    """렌더링 풀 (처음 사용할 때 생성)"""
+    global _chart_executor
+    if _chart_executor is None:
+        if CHART_PROCESSES > 0:
+            # fork는 다른 스레드의 잠금 상태까지 복사하므로 항상 spawn
+            _chart_executor = ProcessPoolExecutor(max_workers=CHART_PROCESSES,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+        else:
+            _chart_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chart")
+    return _chart_executor
+
+def recent_start(today):
+    """최근 7일의 시작 시각 (오늘을 포함해서 7일: 6일 전 0시) - 집계/차트/최근 목록 공통"""
+    return datetime.combine((today - timedelta(days=6)).date(), datetime.min.time())
+
+def filter_recent(stats, today):
+    """최근 7일 집계 필터링"""
+    return stats[stats['day'] >= recent_start(today).date()].copy()
+
+def get_data_version(file_path, stats_recent):
+    """데이터 파일 상태(inode, 크기)와 최근 데이터 건수로 데이터 버전 문자열 생성"""
+    count = int(stats_recent['count'].sum())
+    if file_path == EVENT_FILE:
+        file_path = event_store.index_path(file_path)  # 기록할 때마다 교체됨
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return f"0-0-{count:x}"
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{count:x}"
+
+def get_chart_dpi():
+    """요청의 ?dpi= 값을 선택 가능한 해상도로 제한"""
+    dpi = request.args.get('dpi', CHART_DPI, type=int)
+    return dpi if dpi in CHART_DPI_CHOICES else CHART_DPI
+
+def get_chart_png(name, daily_counts, version, dpi):
+    """
+    캐시된 차트 PNG를 반환하고, 없으면 렌더링 풀에서 렌더링 후 캐시에 저장.
+    같은 차트가 이미 렌더링 중이면 새로 렌더링하지 않고 그 결과를 기다림.
+    """
+    global _chart_executor
+    key = (name, version, dpi)
+    with _chart_lock:
+        png = _chart_cache.get(key)
+        if png is not None:
+            _chart_cache.move_to_end(key)
+            return png
+
+        future = _chart_pending.get(key)
+        owner = future is None
+        if owner:
+            future = get_chart_executor().submit(charts.render_chart, name, daily_counts, dpi)
+            _chart_pending[key] = future
+
+    if not owner:
+        # 먼저 온 요청의 렌더링을 같이 기다림 (chart_wait 건수 = 합쳐진 요청 수)
+        with timed("chart_wait"):
+            return future.result()
+
+    try:
+        with timed(f"chart_{name}"):
+            png = future.result()
+    except BrokenProcessPool:
+        # 렌더링 프로세스가 비정상 종료하면 다음 요청에서 풀을 다시 만듦
+        with _chart_lock:
+            _chart_pending.pop(key, None)
+            _chart_executor = None
+        raise
+    except Exception:
+        with _chart_lock:
+            _chart_pending.pop(key, None)
+        raise
+
+    # 캐시에 넣은 뒤 대기 목록에서 빼야 그 사이 요청이 다시 렌더링하지 않음
+    with _chart_lock:
+        _chart_cache[key] = png
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+        _chart_pending.pop(key, None)
+    return png
+
+@app.route("/chart/<name>.png")
+def chart(name):
+    """차트 이미지 제공 (ETag가 같으면 304 응답)"""
+    if name not in CHART_RENDERERS:
+        abort(404)
+
+    stats_recent = filter_recent(load_daily_stats(), datetime.now())
+    if stats_recent.empty:
+        abort(404)
+
+    dpi = get_chart_dpi()
+    version = get_data_version(get_data_source(), stats_recent)
+    etag = f"{name}-{version}-{dpi}"
+
+    # 브라우저가 이미 같은 버전을 가지고 있으면 렌더링 없이 304
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        daily_counts = get_daily_counts(stats_recent)
+        response = Response(get_chart_png(name, daily_counts, version, dpi), mimetype='image/png')
+    response.set_etag(etag)
+    # 캐시는 하되 매번 ETag로 재검증
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+# ======= JSON API / 실시간 스트림 =======
+# 페이지는 처음 한 번만 렌더링하고, 이후에는 /api/stream(SSE)으로 새 이벤트와 바뀐 집계만 받아서 브라우저에서 갱신
+STREAM_INTERVAL = 1.0      # 로그 변경 확인 주기 (초)
+STREAM_HEARTBEAT = 15.0    # 변경이 없을 때 연결 유지용 주석 전송 주기 (초)
+STREAM_EVENT_LIMIT = 50    # 한 번에 보낼 최대 새 이벤트 수
+RECENT_LIMIT = 10          # 최근 결함 목록 기본 개수
+
+def build_stats(stats_recent, today):
+    """최근 집계로 요약/일별/클래스별 통계 dict 생성 (JSON 응답과 페이지 렌더링 공용)"""
+    defects = stats_recent[stats_recent['defect_type'] != 'normal']
+    total_defects = int(defects['count'].sum())
+    avg_confidence = defects['conf_sum'].sum() / total_defects if total_defects else None
+    summary = {
+        'today_date': today.strftime('%Y-%m-%d %H:%M'),
+        'total_defects': total_defects,
+        'today_defects': int(defects.loc[defects['day'] == today.date(), 'count'].sum()),
+        'defect_types': int(defects.loc[defects['count'] > 0, 'defect_type'].nunique()),
+        'avg_confidence': round(avg_confidence * 100, 1) if avg_confidence is not None else None,
+        'data_source': get_data_source(),
     }
-    labels_mapped = [label_map[label] for label in defect_counts.index]
 
-    color_map = {
-        'tearing (찢어짐)': "#F39F9F",       
-        'contaminated (오염)': "#B8AECF",    
-        'normal (정상)': "#D2F8D1"          
+    daily = {}
+    if not stats_recent.empty:
+        daily_counts = get_daily_counts(stats_recent)
+        daily = {day.isoformat(): {defect_type: int(count) for defect_type, count in row.items()}
+                 for day, row in daily_counts.iterrows()}
+
+    classes = {}
+    for defect_type, group in stats_recent.groupby('defect_type'):
+        count = int(group['count'].sum())
+        classes[defect_type] = {
+            'count': count,
+            'avg_confidence': round(group['conf_sum'].sum() / count, 3) if count else None,
+            'conf_min': round(float(group['conf_min'].min()), 3),
+            'conf_max': round(float(group['conf_max'].max()), 3),
+        }
+    return {'summary': summary, 'daily': daily, 'classes': classes}
+
+def current_stats():
+    """최근 7일 통계 (build_stats 형식)"""
+    today = datetime.now()
+    return build_stats(filter_recent(load_daily_stats(), today), today)
+
+def records_to_json(df):
+    """결함 DataFrame을 JSON으로 보낼 dict 리스트로 변환 (스냅샷이 있으면 'snapshot': {'crop', 'frame'} 해시)"""
+    if df.empty:
+        return []
+    snapshots = get_snapshot_links()
+    records = []
+    for timestamp, defect_type, confidence, camera in zip(df['timestamp'], df['defect_type'],
+                                                          df['confidence'], df['camera']):
+        record = {'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'), 'defect_type': defect_type,
+                  'confidence': round(float(confidence), 3), 'camera': camera}
+        snapshot = snapshots.get(f"{record['timestamp']}|{camera}|{defect_type}")
+        if snapshot is not None:
+            record['snapshot'] = snapshot
+        records.append(record)
+    return records
+
+def load_events_since(position=None, limit=STREAM_EVENT_LIMIT):
+    """
+    position 이후에 추가된 이벤트 중 마지막 limit개와 새 position 반환.
+    position이 None(또는 다른 데이터 소스의 위치)이면 현재 position만 반환.
+    이벤트 저장소의 position은 (가장 최근 파티션 이름, 레코드 수)이고 가장 최근 파티션에 추가된 레코드만 보냄.
+    텍스트 로그의 position은 지금까지 본 줄 수이고, 파일이 줄었으면 처음부터 다시 읽음.
+    """
+    file_path = get_data_source()
+    if file_path == EVENT_FILE:
+        if not isinstance(position, tuple):
+            return pd.DataFrame(), event_store.tail_position(file_path)
+        events, position = event_store.read_since(file_path, position, limit)
+        return events_to_frame(events, event_store.load_meta(file_path)), position
+
+    df = parse_defect_data(file_path)
+    count = len(df)
+    if not isinstance(position, int):
+        return pd.DataFrame(), count
+    if position > count:
+        position = 0
+    return df.iloc[max(position, count - limit):], count
+
+def parse_stream_position(value):
+    """Last-Event-ID/?since= 값 -> position ("파티션 이름:레코드 수" 또는 줄 수)"""
+    if not value:
+        return None
+    try:
+        if ':' in value:
+            name, count = value.rsplit(':', 1)
+            return name, int(count)
+        return int(value)
+    except ValueError:
+        return None
+
+def format_stream_position(position):
+    """position -> SSE 이벤트 ID"""
+    return f"{position[0]}:{position[1]}" if isinstance(position, tuple) else position
+
+def get_stream_signature():
+    """데이터가 바뀌었는지 비교할 값 (데이터 소스, 파일 상태, 롤업 상태, 날짜)"""
+    file_path = get_data_source()
+    signature = [file_path, datetime.now().date()]
+    paths = [file_path]
+    if file_path == EVENT_FILE:
+        paths = [file_path, event_store.index_path(file_path), event_store.rollup_path(file_path)]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def diff_stats(old, new):
+    """이전 통계와 달라진 부분만 반환 (old가 None이면 전체)"""
+    if old is None:
+        old = {'summary': None, 'daily': {}, 'classes': {}}
+
+    changed = {}
+    if new['summary'] != old['summary']:
+        changed['summary'] = new['summary']
+    # 일별/클래스별은 바뀐 항목만 보내고, 항목 목록이 바뀌면(날짜 변경 등) 전체 키 목록도 같이 보냄
+    for key, names_key in (('daily', 'days'), ('classes', 'class_names')):
+        items = {name: value for name, value in new[key].items() if old[key].get(name) != value}
+        if items or new[key].keys() != old[key].keys():
+            changed[key] = items
+            changed[names_key] = sorted(new[key])
+    return changed
+
+def sse(event, data, event_id=None):
+    """Server-Sent Events 메시지 한 개"""
+    message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+@app.route("/api/summary")
+def api_summary():
+    """요약 통계 (주간 불량 총합, 금일 불량, 불량 유형 수, 평균 신뢰도)"""
+    return jsonify(current_stats()['summary'])
+
+@app.route("/api/daily")
+def api_daily():
+    """최근 7일 일자별 클래스별 건수"""
+    daily = current_stats()['daily']
+    return jsonify({'days': sorted(daily), 'daily': daily})
+
+@app.route("/api/classes")
+def api_classes():
+    """최근 7일 클래스별 건수/신뢰도"""
+    return jsonify(current_stats()['classes'])
+
+@app.route("/api/recent")
+def api_recent():
+    """최근 결함 목록 (?limit=, 최대 100)"""
+    limit = min(request.args.get('limit', RECENT_LIMIT, type=int), 100)
+    recent = load_recent_defects(recent_start(datetime.now()), limit=limit)
+    return jsonify(records_to_json(recent))
+
+@app.route("/api/stream")
+def api_stream():
+    """
+    SSE 스트림. 로그가 바뀌면 새 이벤트(events)와 바뀐 집계(stats)만 보냄.
+    브라우저가 재연결하면 Last-Event-ID(스트림 위치) 이후부터 이어서 보냄.
+    """
+    since = parse_stream_position(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    def generate():
+        position = since
+        source = get_data_source()
+        if position is None:
+            _, position = load_events_since()
+
+        signature = None
+        last_stats = None
+        last_sent = time.monotonic()
+        while True:
+            current = get_stream_signature()
+            if current != signature:
+                signature = current
+                # 데이터 소스가 바뀌면(텍스트 로그 -> 이벤트 저장소) 이벤트 번호가 달라지므로 새로 시작
+                if current[0] != source:
+                    source = current[0]
+                    _, position = load_events_since()
+                    last_stats = None
+                    yield sse('reset', {'data_source': source})
+
+                new_events, position = load_events_since(position)
+                if not new_events.empty:
+                    yield sse('events', records_to_json(new_events),
+                              event_id=format_stream_position(position))
+
+                stats = current_stats()
+                changed = diff_stats(last_stats, stats)
+                last_stats = stats
+                if changed:
+                    yield sse('stats', changed)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STREAM_INTERVAL)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 프록시 버퍼링 방지
+    return response
+
+# ======= 기간/구간 조회 =======
+# 클래스별로 시각 순 정렬한 인덱스(로컬 시각 초)를 캐시해두고,
+# 구간 경계를 이진 탐색(searchsorted)해서 경계 위치의 차이로 구간별 건수를 구함 (기간 안의 레코드를 스캔하지 않음)
+# 이벤트 저장소는 파티션마다 인덱스를 따로 만들고 조회 기간과 겹치는 파티션만 읽음
+# (압축된 파티션은 바뀌지 않으므로 계속 재사용, 기록 중인 파티션은 새 레코드를 정렬 없이 뒤에 이어 붙임)
+QUERY_BUCKETS = {'minute': 60, 'hour': 3600, 'day': 86400}
+SHIFTS = [('A', 6), ('B', 14), ('C', 22)]   # 근무조 이름, 시작 시각(시) - 'shift' 구간
+QUERY_MAX_BUCKETS = 5000                    # 한 번에 돌려줄 최대 구간 수
+QUERY_DEFAULT_DAYS = 7
+EPOCH = datetime(1970, 1, 1)
+
+# (file_path, 파티션 이름) -> {'file', 'count', 'classes': {클래스: {'times', 'cameras', 'conf_cumsum'}}}
+# 텍스트 로그는 file_path -> {'count', 'classes', 'camera_names'}
+_index_cache = {}
+_index_lock = threading.Lock()
+
+def to_local_seconds(dt):
+    """로컬 시각(datetime) -> 인덱스 시각(로컬 시각을 UTC처럼 센 초)"""
+    return (dt - EPOCH).total_seconds()
+
+def from_local_seconds(seconds):
+    """인덱스 시각 -> 로컬 시각(datetime)"""
+    return EPOCH + timedelta(seconds=float(seconds))
+
+def append_to_index(entry, times, cameras, confidence):
+    """
+    클래스 하나의 인덱스에 레코드 추가.
+    entry: {'times'(정렬된 시각), 'cameras', 'conf_cumsum'(신뢰도 누적합, 앞에 0)}
+    """
+    if entry is None:
+        entry = {'times': np.zeros(0), 'cameras': np.zeros(0, dtype=np.int64), 'conf_cumsum': np.zeros(1)}
+    if len(times) == 0:
+        return entry
+
+    sorted_new = len(times) < 2 or (np.diff(times) >= 0).all()
+    if sorted_new and (len(entry['times']) == 0 or times[0] >= entry['times'][-1]):
+        # 시간 순서대로 추가된 경우 (대부분): 뒤에 이어 붙이기만 함
+        return {'times': np.concatenate([entry['times'], times]),
+                'cameras': np.concatenate([entry['cameras'], cameras]),
+                'conf_cumsum': np.concatenate([entry['conf_cumsum'],
+                                               entry['conf_cumsum'][-1] + np.cumsum(confidence, dtype=np.float64)])}
+
+    # 이른 시각이 섞여 있으면(배치 검사, 가져오기 등) 다시 정렬
+    old_conf = np.diff(entry['conf_cumsum'])
+    times = np.concatenate([entry['times'], times])
+    order = np.argsort(times, kind='stable')
+    confidence = np.concatenate([old_conf, confidence])[order]
+    return {'times': times[order],
+            'cameras': np.concatenate([entry['cameras'], cameras])[order],
+            'conf_cumsum': np.concatenate([[0.0], np.cumsum(confidence, dtype=np.float64)])}
+
+def add_columns(index, times, class_ids, cameras, confidence, class_names):
+    """(로컬 시각, 클래스 ID, 카메라 ID, 신뢰도) 배열을 클래스별 인덱스에 추가"""
+    for class_id in np.unique(class_ids):
+        name = class_names[class_id]
+        selected = class_ids == class_id
+        index['classes'][name] = append_to_index(index['classes'].get(name), times[selected],
+                                                 cameras[selected], confidence[selected])
+
+def event_columns(events):
+    """이벤트 레코드 -> (로컬 시각, 클래스 ID, 카메라 ID, 신뢰도) 배열"""
+    timestamps = np.asarray(events['timestamp'])
+    return (timestamps + event_store.local_offsets(timestamps), np.asarray(events['class_id']),
+            np.asarray(events['camera']).astype(np.int64), np.asarray(events['confidence'], dtype=np.float64))
+
+def get_time_index(start=None, end=None):
+    """
+    현재 데이터 소스의 시각 인덱스 목록과 카메라 이름 목록.
+    이벤트 저장소는 [start, end) (로컬 시각 datetime)와 겹치는 파티션의 인덱스만 만들거나 갱신.
+    :return: ([인덱스], 카메라 이름 리스트)
+    """
+    file_path = get_data_source()
+    with _index_lock:
+        if file_path == EVENT_FILE:
+            meta = event_store.load_meta(file_path)
+            partitions = event_store.list_partitions(file_path)
+            # 지워진(보관 정책) 파티션의 인덱스 정리
+            names = {(file_path, partition['name']) for partition in partitions}
+            for key in [key for key in _index_cache if isinstance(key, tuple) and key not in names]:
+                del _index_cache[key]
+
+            start_s = start.timestamp() if start is not None else float('-inf')
+            end_s = end.timestamp() if end is not None else float('inf')
+            indexes = []
+            for partition in partitions:
+                if partition['end'] < start_s or partition['start'] >= end_s:
+                    continue
+                key = (file_path, partition['name'])
+                cache = _index_cache.get(key)
+                if cache is None or cache['file'] != partition['file'] or cache['count'] > partition['count']:
+                    cache = {'file': partition['file'], 'count': 0, 'classes': {}}
+                if cache['count'] < partition['count']:
+                    # 새 레코드만 인덱스에 추가
+                    events = event_store.read_partition(partition)
+                    add_columns(cache, *event_columns(events[cache['count']:]), meta['classes'])
+                    cache['count'] = max(len(events), cache['count'])
+                _index_cache[key] = cache
+                indexes.append(cache)
+            return indexes, list(meta['cameras'])
+
+        cache = _index_cache.get(file_path)
+        df = parse_defect_data(file_path)
+        if cache is None or cache['count'] != len(df):
+            cache = {'count': len(df), 'classes': {}, 'camera_names': []}
+            if not df.empty:
+                class_ids, class_names = pd.factorize(df['defect_type'])
+                camera_ids, camera_names = pd.factorize(df['camera'])
+                times = df['timestamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+                add_columns(cache, times, class_ids, camera_ids.astype(np.int64),
+                            df['confidence'].to_numpy(dtype=np.float64), list(class_names))
+                cache['camera_names'] = list(camera_names)
+            _index_cache[file_path] = cache
+        return [cache], cache['camera_names']
+
+def bucket_edges(start, end, bucket):
+    """
+    [start, end) 기간의 구간 경계 시각(인덱스 시각)과 구간 라벨.
+    첫/마지막 경계는 start/end로 잘라서 기간 밖은 세지 않음.
+    """
+    start_s, end_s = to_local_seconds(start), to_local_seconds(end)
+    if bucket == 'shift':
+        # 근무조 시작 시각 목록 (첫 근무조 시작 전 시각은 전날 마지막 근무조)
+        first_day = int(start_s // 86400) - 1
+        last_day = int(end_s // 86400)
+        starts, labels = [], []
+        for day in range(first_day, last_day + 1):
+            for name, hour in SHIFTS:
+                starts.append(day * 86400 + hour * 3600)
+                labels.append(f"{from_local_seconds(day * 86400):%Y-%m-%d} {name}({hour:02d}:00)")
+        starts = np.array(starts, dtype=np.float64)
+        first = np.searchsorted(starts, start_s, side='right') - 1
+        last = np.searchsorted(starts, end_s, side='left')
+        starts, labels = starts[first:last], labels[first:last]
+    else:
+        size = QUERY_BUCKETS[bucket]
+        first, last = int(start_s // size), int(np.ceil(end_s / size))
+        if last - first > QUERY_MAX_BUCKETS:
+            raise ValueError(f"구간이 너무 많습니다 ({last - first}개). 기간을 줄이거나 더 큰 bucket을 사용하세요.")
+        starts = np.arange(first, last, dtype=np.float64) * size
+        fmt = {'minute': '%Y-%m-%d %H:%M', 'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d'}[bucket]
+        labels = [from_local_seconds(t).strftime(fmt) for t in starts]
+
+    if len(starts) > QUERY_MAX_BUCKETS:
+        raise ValueError(f"구간이 너무 많습니다 ({len(starts)}개). 기간을 줄이거나 더 큰 bucket을 사용하세요.")
+    edges = np.append(starts, end_s)
+    edges[0] = start_s
+    return edges, labels
+
+def query_events(start, end, bucket='hour', classes=None, cameras=None):
+    """
+    [start, end) 기간의 이벤트를 구간(bucket)별 클래스별 건수로 집계.
+    :param start, end: 로컬 시각 datetime
+    :param classes, cameras: 포함할 클래스/카메라 이름 리스트 (None이면 전체)
+    :return: {'buckets': 구간 라벨 리스트, 'counts': {클래스: 구간별 건수}, 'avg_confidence': {클래스: 평균}, 'total'}
+    """
+    if bucket not in QUERY_BUCKETS and bucket != 'shift':
+        raise ValueError(f"bucket은 {', '.join([*QUERY_BUCKETS, 'shift'])} 중 하나여야 합니다.")
+    if end <= start:
+        raise ValueError("end는 start보다 뒤여야 합니다.")
+
+    edges, labels = bucket_edges(start, end, bucket)
+    indexes, camera_names = get_time_index(start, end)
+    camera_ids = None
+    if cameras:
+        camera_ids = [i for i, name in enumerate(camera_names) if name in cameras]
+
+    # 파티션별 인덱스의 구간별 건수/신뢰도 합을 클래스별로 더함
+    class_counts, conf_sums = {}, {}
+    for index in indexes:
+        for name, entry in index['classes'].items():
+            if classes and name not in classes:
+                continue
+            times = entry['times']
+            # 기간 경계만 이진 탐색
+            lo, hi = np.searchsorted(times, [edges[0], edges[-1]], side='left')
+            if camera_ids is None:
+                positions = np.searchsorted(times, edges, side='left')
+                conf_sum = entry['conf_cumsum'][hi] - entry['conf_cumsum'][lo]
+            else:
+                # 카메라 조건은 기간 안 레코드만 걸러서 다시 경계 탐색
+                selected = np.isin(entry['cameras'][lo:hi], camera_ids)
+                times = times[lo:hi][selected]
+                positions = np.searchsorted(times, edges, side='left')
+                conf_sum = np.diff(entry['conf_cumsum'][lo:hi + 1])[selected].sum()
+            class_counts[name] = class_counts.get(name, 0) + np.diff(positions)
+            conf_sums[name] = conf_sums.get(name, 0.0) + conf_sum
+
+    counts, avg_confidence = {}, {}
+    for name, bucket_counts in sorted(class_counts.items()):
+        total = int(bucket_counts.sum())
+        if total == 0 and not (classes and name in classes):
+            continue
+        counts[name] = bucket_counts.tolist()
+        avg_confidence[name] = round(float(conf_sums[name] / total), 3) if total else None
+
+    return {
+        'start': start.isoformat(timespec='seconds'),
+        'end': end.isoformat(timespec='seconds'),
+        'bucket': bucket,
+        'buckets': labels,
+        'counts': counts,
+        'avg_confidence': avg_confidence,
+        'total': sum(sum(values) for values in counts.values()),
     }
-    colors = [color_map[label] for label in labels_mapped]
-
-    plt.pie(defect_counts.values, labels=labels_mapped, autopct='%1.1f%%', 
-            colors=colors, startangle=90)
-    plt.title('검사 유형별 통계 (최근 7일)', fontsize=16, fontweight='bold')
-    plt.axis('equal')
-    plt.tight_layout()
-    
-    img = io.BytesIO()
-    plt.savefig(img, format='png', dpi=300, bbox_inches='tight')
-    img.seek(0)
-    plot_url = base64.b64encode(img.getvalue()).decode()
-    plt.close()
-    
-    return plot_url
+
+def parse_query_time(value, default):
+    """
+    쿼리 파라미터 시각 (2026-01-01, 2026-01-01T09:00 등 ISO 형식).
+    시간대가 있으면(2026-01-01T09:00+09:00) 로컬 시각으로 바꿔서 시간대 없는 datetime으로 반환.
+    """
+    if not value:
+        return default
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+@app.route("/api/query")
+def api_query():
+    """
+    기간/구간 조회.
+    ?start=2026-01-01T06:00&end=2026-01-02&bucket=minute|hour|day|shift&class=tearing&camera=cam0
+    (start/end 생략 시 최근 7일, class/camera는 여러 번 지정 가능)
+    """
+    try:
+        end = parse_query_time(request.args.get('end'), datetime.now())
+        start = parse_query_time(request.args.get('start'), end - timedelta(days=QUERY_DEFAULT_DAYS))
+        with timed("query"):
+            result = query_events(start, end, request.args.get('bucket', 'hour'),
+                                  classes=request.args.getlist('class') or None,
+                                  cameras=request.args.getlist('camera') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+# ======= 라이브 영상 (MJPEG) =======
+# 인스펙터가 공유 메모리에 쓴 프레임을 카메라별 FrameBroadcaster가 한 번만 JPEG으로 인코딩해서 모든 시청자에게 보냄
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+def get_live_cameras():
+    """라이브 영상을 볼 수 있는 카메라 ID 목록 (인스펙터가 실행 중이 아니면 빈 리스트)"""
+    streams = frame_share.load_streams()
+    return sorted(streams['cameras']) if streams else []
+
+def get_broadcaster(camera_id):
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(camera_id)
+        if broadcaster is None:
+            broadcaster = _broadcasters[camera_id] = frame_share.FrameBroadcaster(camera_id)
+        return broadcaster
+
+@app.route("/stream/<camera_id>.mjpg")
+def live_stream(camera_id):
+    """카메라 MJPEG 스트림 (<img src="/stream/cam0.mjpg">로 표시)"""
+    if camera_id not in get_live_cameras():
+        abort(404)
+    response = Response(get_broadcaster(camera_id).stream(),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route("/live")
+def live():
+    """카메라 라이브 영상 페이지 (로그가 없어도 볼 수 있음)"""
+    live_template = """
+    <!DOCTYPE html>
+    <html lang="ko">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Live View</title>
+        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+    </head>
+    <body class="bg-dark text-light">
+        <div class="container-fluid mt-3">
+            <h3>라이브 영상 <a href="{{ url_for('dashboard') }}" class="btn btn-sm btn-outline-light ms-2">Dashboard</a></h3>
+            {% if cameras %}
+            <div class="row">
+                {% for camera_id in cameras %}
+                <div class="col-lg-6 mb-3">
+                    <h5>{{ camera_id }}</h5>
+                    <img src="{{ url_for('live_stream', camera_id=camera_id) }}" class="img-fluid" alt="{{ camera_id }}">
+                </div>
+                {% endfor %}
+            </div>
+            {% else %}
+            <div class="alert alert-secondary">인스펙터(main.py)가 실행 중이 아닙니다. 실행 후 새로고침하세요.</div>
+            {% endif %}
+        </div>
+    </body>
+    </html>
+    """
+    return render_template_string(live_template, cameras=get_live_cameras())
+
+# ======= 결함 스냅샷 =======
+# 인스펙터가 snapshots/에 저장한 이미지 (파일 이름이 내용 해시이므로 한 번 받은 이미지는 바뀌지 않음 -> 오래 캐시)
+SNAPSHOT_MAX_AGE = 365 * 24 * 3600
+SNAPSHOT_NAME = re.compile(r'^[0-9a-f]{32}(_t)?$')
+
+# index.jsonl에서 읽은 위치와 결함 키 -> {'crop', 'frame'} (추가된 줄만 이어서 읽음)
+_snapshot_cache = {'position': None, 'links': {}}
+_snapshot_lock = threading.Lock()
+
+def get_snapshot_links():
+    """결함 키(snapshot_store.snapshot_key) -> 스냅샷 해시"""
+    with _snapshot_lock:
+        previous = _snapshot_cache['position']
+        entries, position = snapshot_store.read_index(position=previous)
+        if position is None or previous is None or position[0] != previous[0]:
+            _snapshot_cache['links'] = {}  # 처음 읽거나 보관 정책으로 색인을 다시 씀
+        links = _snapshot_cache['links']
+        for entry in entries:
+            key = snapshot_store.snapshot_key(entry['timestamp'], entry['camera'], entry['class'])
+            links[key] = {'crop': entry['crop'], 'frame': entry['frame']}
+        _snapshot_cache['position'] = position
+        return links
+
+@app.route("/snapshot/<name>.jpg")
+def snapshot(name):
+    """스냅샷 이미지 (<해시>.jpg) 또는 썸네일 (<해시>_t.jpg)"""
+    if not SNAPSHOT_NAME.match(name):
+        abort(404)
+    digest = name[:32]
+    path = snapshot_store.snapshot_path(digest, thumb=name.endswith('_t'))
+    if not os.path.exists(path):
+        abort(404)
+    response = send_file(os.path.abspath(path), mimetype='image/jpeg', etag=name,
+                         max_age=SNAPSHOT_MAX_AGE, conditional=True)
+    response.headers['Cache-Control'] = f'public, max-age={SNAPSHOT_MAX_AGE}, immutable'
+    return response
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """대시보드와 인스펙터(main.py)의 단계별 처리 시간 (Prometheus 텍스트 형식)"""
+    inspector = metrics.load_snapshot()
+    if inspector and inspector.get('pid') == os.getpid():
+        # 검사 프로그램 안에서 스레드로 실행 중이면 한 레지스트리에 두 단계가 모두 있음
+        snapshots = {'inspector': metrics.snapshot()}
+        gauge_values = {'inspector': metrics.gauges()}
+    else:
+        snapshots = {'dashboard': metrics.snapshot()}
+        gauge_values = {}
+        if inspector:
+            snapshots['inspector'] = inspector['stages']
+            gauge_values['inspector'] = inspector.get('gauges', {})
+    return Response(metrics.render_prometheus(snapshots, gauge_values), mimetype='text/plain; version=0.0.4')
 
 @app.route("/")
 @app.route("/log")
 # @app.route("/dashboard")
 def dashboard():
     try:
-        # 데이터 로드 및 파싱
-        df = parse_defect_data("defect_log.txt")
+        # 일자 x 클래스 집계 로드 (원본 레코드를 다시 집계하지 않음)
+        data_source = get_data_source()
+        with timed("dashboard_parse"):
+            stats = load_daily_stats()
         
-        if df.empty:
-            return render_error("No data found or error parsing defect_log.txt")
+        if stats.empty:
+            return render_error(f"No data found or error parsing {data_source}")
         
         # 최근 7일 데이터 필터링
         today = datetime.now()
-        seven_days_ago = today - timedelta(days=7)
-        df_recent = df[df['timestamp'] >= seven_days_ago].copy()
+        with timed("dashboard_filter"):
+            stats_recent = filter_recent(stats, today)
         
-        if df_recent.empty:
+        if stats_recent.empty:
             return render_error("최근 7일간의 데이터가 없습니다.")
         
-        # 통계 계산
-        # total_defects = len(df_recent)
-        # today_defects = len(df_recent[df_recent['timestamp'].dt.date == today.date()])
-        # defect_types = df_recent['defect_type'].nunique()
-        # avg_confidence = df_recent['confidence'].mean()
-        total_defects = len(df_recent[df_recent['defect_type'] != 'normal'])
-        today_defects = len(df_recent[(df_recent['timestamp'].dt.date == today.date()) & 
-                                    (df_recent['defect_type'] != 'normal')])
-        defect_types = df_recent[df_recent['defect_type'] != 'normal']['defect_type'].nunique()
-        avg_confidence = df_recent[df_recent['defect_type'] != 'normal']['confidence'].mean()
+        # 통계 계산 (정상 제외, 일별/클래스별 포함)
+        with timed("dashboard_groupby"):
+            stats_data = build_stats(stats_recent, today)
+        summary = stats_data['summary']
         
-        # 차트 생성
-        daily_chart = create_daily_chart(df_recent)
-        pie_chart = create_defect_type_pie_chart(df_recent)
+        # 차트 URL 생성 (PNG 차트는 /chart/<name>.png 에서 따로 받아감, 페이지는 브라우저에서 직접 그림)
+        # 데이터 버전(v)이 바뀌면 URL도 바뀌므로 브라우저 캐시가 자동으로 갱신됨
+        dpi = get_chart_dpi()
+        version = get_data_version(data_source, stats_recent)
+        daily_chart = url_for('chart', name='daily', v=version, dpi=dpi)
+        pie_chart = url_for('chart', name='pie', v=version, dpi=dpi)
         
         # 최근 결함 목록 (최대 10개)
-        recent_defects = df_recent.sort_values('timestamp', ascending=False).head(10)
-        
-        # 결함 타입별 통계
-        defect_stats = df_recent.groupby('defect_type').agg({
-            'confidence': ['count', 'mean']
-        }).round(3)
-        defect_stats.columns = ['Count', 'Avg Confidence']
-        defect_stats = defect_stats.reset_index()
+        recent_defects = records_to_json(load_recent_defects(recent_start(today), limit=RECENT_LIMIT))
         
         # HTML 템플릿 파일 읽기
         def load_template():
@@ -187,16 +885,19 @@ def dashboard():
         
         html_template = load_template()
         
+        # 브라우저는 initial로 첫 화면을 그리고 /api/stream으로 갱신
         return render_template_string(html_template,
-                                    today_date=today.strftime('%Y-%m-%d %H:%M'),
-                                    total_defects=total_defects,
-                                    today_defects=today_defects,
-                                    defect_types=defect_types,
-                                    avg_confidence=round(avg_confidence * 100, 1),
+                                    today_date=summary['today_date'],
+                                    total_defects=summary['total_defects'],
+                                    today_defects=summary['today_defects'],
+                                    defect_types=summary['defect_types'],
+                                    avg_confidence=summary['avg_confidence'],
                                     daily_chart=daily_chart,
                                     pie_chart=pie_chart,
                                     recent_defects=recent_defects,
-                                    defect_stats=defect_stats)
+                                    initial=dict(stats_data, recent=recent_defects),
+                                    live_cameras=get_live_cameras(),
+                                    data_source=data_source)
         
     except Exception as e:
         return render_error(f"Dashboard error: {str(e)}")
@@ -230,5 +931,31 @@ def render_error(message):
     """
     return render_template_string(error_template, error_message=message)
 
+# ======= 서버 실행 =======
+# 현장 화면 여러 대와 관리자들이 동시에 접속하므로 운영 서버(waitress, 멀티 스레드)로 실행
+# /api/stream(SSE)과 /stream/*.mjpg는 연결 하나가 스레드 하나를 계속 쓰므로 스레드 수를 넉넉히 잡음
+# 리눅스에서는 gunicorn도 사용 가능: gunicorn -c gunicorn.conf.py flask_app:app
+SERVER_THREADS = 32
+
+def serve(host="127.0.0.1", port=5000, threads=SERVER_THREADS):
+    """운영 서버로 실행 (waitress가 없으면 Flask 내장 서버를 스레드 모드로)"""
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print("waitress가 설치되어 있지 않아 Flask 내장 서버로 실행합니다. (pip install waitress)")
+        app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+        return
+    waitress_serve(app, host=host, port=port, threads=threads)
+
 if __name__ == "__main__":
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    # python flask_app.py [--host 0.0.0.0] [--port 5000] [--debug]
+    parser = argparse.ArgumentParser(description="결함 대시보드 서버")
+    parser.add_argument("--host", default="127.0.0.1", help="다른 PC에서 접속하려면 0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--debug", action="store_true", help="개발용 서버 (코드 변경 시 자동 재시작)")
+    args = parser.parse_args()
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        serve(args.host, args.port, args.threads)
\ No newline at end of file
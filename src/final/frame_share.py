@@ -0,0 +1,256 @@
+"""
+공유 메모리 프레임 링 버퍼 (인스펙터 -> 대시보드 MJPEG)
+
+인스펙터가 카메라별로 오버레이를 그린 표시 크기 BGR 프레임을 multiprocessing.shared_memory 링 버퍼에 쓰고,
+대시보드는 같은 이름으로 붙어서 가장 최근 프레임을 읽음 (파일/소켓으로 프레임을 보내지 않음).
+카메라별 버퍼 이름은 INSPECTOR_STREAMS_FILE에 기록.
+대시보드는 FrameBroadcaster로 새 프레임을 JPEG으로 한 번만 인코딩해서 모든 시청자에게 같은 bytes를 보냄.
+
+메모리 구성: [헤더 int64 x 4: 최신 seq, 칸 수, 높이, 너비][칸별 seq int64][프레임 x 칸 수]
+쓰는 쪽은 칸의 seq를 -1로 바꾼 뒤 프레임을 쓰고 seq를 기록하므로,
+읽는 쪽은 복사 전후 칸의 seq가 같은지 보고 쓰는 도중의 프레임을 걸러냄.
+"""
+import json
+import os
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from event_store import write_json
+
+SLOTS = 3           # 링 버퍼 칸 수 (읽는 도중 같은 칸이 다시 쓰이지 않을 만큼)
+HEADER_FIELDS = 4   # 최신 seq, 칸 수, 높이, 너비
+
+STREAM_FPS = 15       # MJPEG 최대 전송 프레임 수 (초당)
+JPEG_QUALITY = 80
+STREAM_TIMEOUT = 5.0  # 새 프레임이 없을 때 마지막 프레임을 다시 보내는 주기 (끊긴 시청자 정리용, 초)
+
+# 인스펙터 -> 대시보드 공유 파일 (카메라 ID -> 버퍼 이름)
+INSPECTOR_STREAMS_FILE = "inspector_streams.json"
+
+# 이 프로세스에서 만든 링 버퍼
+# 대시보드가 같은 프로세스("thread" 모드)에서 실행되면 다시 붙지 않고 같은 메모리를 사용
+_local_rings = {}
+
+
+def ring_name(camera_id):
+    """카메라별 공유 메모리 이름 (비정상 종료 후 다시 실행하면 같은 이름을 정리하고 재사용)"""
+    return f"defect_frames_{camera_id}"
+
+
+def _attach_untracked(name):
+    """
+    다른 프로세스가 만든 공유 메모리에 붙기.
+    POSIX에서 파이썬 3.12 이하는 붙기만 해도 resource_tracker에 등록되어 이 프로세스가 끝날 때 지워지므로 등록 해제.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # 파이썬 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class FrameRing:
+    """
+    카메라 하나의 프레임 링 버퍼.
+    쓰는 쪽: FrameRing.create() -> write(), 읽는 쪽: FrameRing.attach() -> latest_seq() / read().
+    """
+
+    def __init__(self, shm, owner=False, borrowed=False):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner        # 만든 쪽 (close()에서 공유 메모리 삭제)
+        self.borrowed = borrowed  # 같은 프로세스의 버퍼를 빌려 쓰는 중 (close()에서 닫지 않음)
+
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        slots, height, width = (int(value) for value in self.header[1:])
+        self.shape = (height, width, 3)
+        self.slot_seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=HEADER_FIELDS * 8)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf,
+                                 offset=(HEADER_FIELDS + slots) * 8)
+
+    @classmethod
+    def create(cls, name, shape, slots=SLOTS):
+        """shape(높이, 너비) 프레임을 담을 링 버퍼 생성"""
+        height, width = shape[:2]
+        size = (HEADER_FIELDS + slots) * 8 + slots * height * width * 3
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 이전 실행이 비정상 종료해서 남은 버퍼
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (-1, slots, height, width)
+        del header
+        ring = cls(shm, owner=True)
+        ring.slot_seqs[:] = -1
+        _local_rings[ring.name] = ring
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """이름으로 링 버퍼에 붙기 (없으면 FileNotFoundError)"""
+        local = _local_rings.get(name)
+        if local is not None:
+            return cls(local.shm, borrowed=True)
+        return cls(_attach_untracked(name))
+
+    def write(self, frame):
+        """프레임을 다음 칸에 복사하고 seq 반환 (크기가 다르면 칸 크기로 줄여서 씀)"""
+        seq = int(self.header[0]) + 1
+        index = seq % len(self.slot_seqs)
+        slot = self.frames[index]
+
+        self.slot_seqs[index] = -1  # 쓰는 중
+        if frame.shape == slot.shape:
+            np.copyto(slot, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=slot, interpolation=cv2.INTER_LINEAR)
+        self.slot_seqs[index] = seq
+        self.header[0] = seq
+        return seq
+
+    def latest_seq(self):
+        """가장 최근에 쓴 프레임의 seq (아직 없으면 -1)"""
+        return int(self.header[0])
+
+    def read(self, out=None):
+        """
+        가장 최근 프레임을 out(없거나 크기가 다르면 새로 생성)에 복사.
+        :return: (seq, 프레임), 아직 프레임이 없거나 계속 덮어쓰이는 중이면 (-1, None)
+        """
+        if out is None or out.shape != self.shape:
+            out = np.empty(self.shape, dtype=np.uint8)
+
+        for _ in range(len(self.slot_seqs)):
+            seq = int(self.header[0])
+            if seq < 0:
+                break
+            index = seq % len(self.slot_seqs)
+            if self.slot_seqs[index] != seq:
+                continue  # 그 사이 다음 프레임을 쓰기 시작함
+            np.copyto(out, self.frames[index])
+            if self.slot_seqs[index] == seq:
+                return seq, out
+        return -1, None
+
+    def close(self):
+        """버퍼 닫기 (만든 쪽이면 공유 메모리 삭제)"""
+        # numpy 뷰가 남아 있으면 공유 메모리를 닫을 수 없음
+        self.header = self.slot_seqs = self.frames = None
+        if self.borrowed:
+            return
+        if self.owner:
+            _local_rings.pop(self.name, None)
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 같은 프로세스의 대시보드가 아직 읽는 중 (프로세스가 끝날 때 해제됨)
+        if self.owner:
+            self.shm.unlink()
+
+
+def save_streams(rings, started, path=INSPECTOR_STREAMS_FILE):
+    """카메라 ID -> 버퍼 이름을 파일로 저장 (started: 인스펙터 시작 시각, 대시보드가 재시작을 알아챔)"""
+    write_json(path, {'pid': os.getpid(), 'started': started,
+                      'cameras': {camera_id: ring.name for camera_id, ring in rings.items()}})
+
+
+def load_streams(path=INSPECTOR_STREAMS_FILE):
+    """save_streams()로 저장한 정보 읽기 (없으면 None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class FrameBroadcaster:
+    """
+    카메라 하나의 MJPEG 방송.
+    시청자가 있는 동안만 인코딩 스레드 하나가 링 버퍼의 새 프레임을 JPEG으로 한 번 인코딩하고,
+    시청자별 stream()은 같은 JPEG bytes를 그대로 보냄 (시청자 수만큼 인코딩/복사하지 않음).
+    """
+
+    def __init__(self, camera_id, fps=STREAM_FPS, quality=JPEG_QUALITY):
+        self.camera_id = camera_id
+        self.interval = 1.0 / fps
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.condition = threading.Condition()
+        self.jpeg = None   # 가장 최근 JPEG
+        self.version = 0   # 인코딩할 때마다 증가 (시청자가 새 프레임인지 확인)
+        self.viewers = 0
+        self.thread = None
+
+    def _encode_loop(self):
+        """시청자가 모두 나갈 때까지 새 프레임을 인코딩"""
+        ring, source, buffer, last_seq = None, None, None, -1
+        next_check = 0.0
+        while True:
+            with self.condition:
+                if self.viewers == 0:
+                    self.thread = None
+                    break
+
+            # 인스펙터가 다시 시작하거나 종료했는지 1초마다 확인
+            now = time.monotonic()
+            if now >= next_check:
+                next_check = now + 1.0
+                streams = load_streams() or {}
+                name = streams.get('cameras', {}).get(self.camera_id)
+                current = (streams.get('started'), name) if name else None
+                if current != source:
+                    if ring is not None:
+                        ring.close()
+                    ring, source, last_seq = None, current, -1
+                if ring is None and name:
+                    try:
+                        ring = FrameRing.attach(name)
+                    except FileNotFoundError:
+                        pass
+
+            if ring is not None and ring.latest_seq() != last_seq:
+                seq, frame = ring.read(buffer)
+                if frame is not None:
+                    buffer, last_seq = frame, seq
+                    ok, encoded = cv2.imencode('.jpg', frame, self.params)
+                    if ok:
+                        with self.condition:
+                            self.jpeg = encoded.tobytes()
+                            self.version += 1
+                            self.condition.notify_all()
+            time.sleep(self.interval)
+
+        if ring is not None:
+            ring.close()
+
+    def stream(self):
+        """시청자 한 명의 multipart/x-mixed-replace 응답 본문"""
+        with self.condition:
+            self.viewers += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._encode_loop, daemon=True)
+                self.thread.start()
+        try:
+            seen = None
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.version != seen, timeout=STREAM_TIMEOUT)
+                    jpeg, seen = self.jpeg, self.version
+                if jpeg is None:
+                    continue
+                yield b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg)
+                yield jpeg
+                yield b"\r\n"
+        finally:
+            with self.condition:
+                self.viewers -= 1
@@ -0,0 +1,87 @@
+"""
+YOLO 앞단 변화 감지 게이트
+
+프로토타입(src/prototypes/main.py)의 check_defect(HSV 차이 평균)와 템플릿 매칭 제품 유무 판단을
+추론 전 단계로 재사용해서, ROI에 제품이 없거나 마지막 추론 이후 변화가 없으면 추론을 건너뜀.
+"""
+import cv2
+import numpy as np
+
+# 비교용으로 줄일 ROI 크기 (작을수록 빠름)
+GATE_SIZE = (64, 64)
+
+
+def check_defect(baseline_img, current_img, threshold=30):
+    """
+    기준 이미지와 현재 이미지를 비교하여 불량 여부를 반환.
+    :param baseline_img: 기준 이미지 (BGR)
+    :param current_img: 현재 이미지 (BGR)
+    :param threshold: 평균 색상 차이 임계값
+    :return: (결과 텍스트, 차이 영상, 평균 차이 값)
+    """
+    current_resized = cv2.resize(current_img, (baseline_img.shape[1], baseline_img.shape[0]))
+
+    baseline_hsv = cv2.cvtColor(baseline_img, cv2.COLOR_BGR2HSV)
+    current_hsv = cv2.cvtColor(current_resized, cv2.COLOR_BGR2HSV)
+
+    diff = cv2.absdiff(baseline_hsv, current_hsv)
+    diff_gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+
+    mean_diff = np.mean(diff_gray)
+
+    if mean_diff > threshold:
+        return "Defective", diff_gray, mean_diff
+    else:
+        return "Normal", diff_gray, mean_diff
+
+
+def match_baseline(baseline_img, current_img):
+    """템플릿 매칭으로 ROI 안에 기준 제품과 비슷한 형태가 있는지 유사도 반환 (1 → 동일)"""
+    res = cv2.matchTemplate(current_img, baseline_img, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, _ = cv2.minMaxLoc(res)
+    return max_val
+
+
+class ChangeGate:
+    """
+    카메라 하나의 추론 여부 판단.
+    check()가 "run"이면 추론하고 remember()로 기준 ROI를 갱신,
+    "static"이면 마지막 결과를 재사용, "empty"면 빈 결과를 사용.
+    """
+
+    def __init__(self, baseline_img=None, change_threshold=6.0, match_threshold=0.5, max_skip=50):
+        self.baseline = baseline_img
+        self.change_threshold = change_threshold  # 마지막 추론 ROI와의 평균 HSV 차이 기준
+        self.match_threshold = match_threshold    # 템플릿 매칭 유사도 기준
+        self.max_skip = max_skip                  # 연속으로 건너뛸 수 있는 최대 프레임 수
+        self.reference = None                     # 마지막으로 추론한 ROI (축소본)
+        self.last_result = []
+        self.skipped = 0
+
+    def check(self, roi_img):
+        """ROI 이미지로 "run" / "static" / "empty" 판단"""
+        if self.skipped >= self.max_skip:
+            return "run"
+
+        # 기준 이미지가 있으면 제품 유무부터 확인
+        if self.baseline is not None:
+            if self.baseline.shape[:2] != roi_img.shape[:2]:
+                self.baseline = cv2.resize(self.baseline, (roi_img.shape[1], roi_img.shape[0]))
+            if match_baseline(self.baseline, roi_img) <= self.match_threshold:
+                self.skipped += 1
+                self.reference = None
+                return "empty"
+
+        # 마지막 추론 ROI와 비교
+        if self.reference is not None:
+            _, _, mean_diff = check_defect(self.reference, roi_img, self.change_threshold)
+            if mean_diff <= self.change_threshold:
+                self.skipped += 1
+                return "static"
+
+        return "run"
+
+    def remember(self, roi_img):
+        """추론한 ROI를 다음 비교 기준으로 저장"""
+        self.reference = cv2.resize(roi_img, GATE_SIZE)
+        self.skipped = 0
@@ -0,0 +1,14 @@
+"""
+리눅스 운영 서버 설정
+gunicorn -c gunicorn.conf.py flask_app:app
+
+워커(프로세스)마다 차트 캐시/렌더링 풀/라이브 영상 인코더를 따로 가지므로 워커 수는 적게,
+/api/stream(SSE)과 /stream/*.mjpg는 연결 하나가 스레드 하나를 계속 쓰므로 스레드는 넉넉히.
+"""
+bind = "0.0.0.0:5000"
+workers = 2
+worker_class = "gthread"
+threads = 16
+timeout = 60
+# 워커마다 차트 렌더링 프로세스 2개
+raw_env = ["DASHBOARD_CHART_PROCESSES=2"]
@@ -0,0 +1,84 @@
+"""
+YOLO 추론 공통 함수
+
+인스펙터(main.py)와 배치 검사(batch_inspect.py)에서 같이 사용.
+탐지 결과는 프레임 좌표 기준 (x1, y1, x2, y2, conf, tag, track_id) 튜플 리스트 (track_id는 추적 전이면 None).
+분할(seg) 모델은 마스크를 만들지 않고 박스만 후처리 (마스크 면적이 필요하면 area_rois로 ROI 안 탐지만 계산).
+"""
+
+
+def crop_roi(frame, roi):
+    """프레임에서 ROI 영역 잘라내기 (복사 없음)"""
+    x, y, w, h = roi
+    return frame[y:y+h, x:x+w]
+
+
+def in_roi(roi, x1, y1, x2, y2):
+    """바운딩 박스 중심이 ROI 안에 있는지 확인"""
+    roi_x, roi_y, roi_w, roi_h = roi
+    cx = int((x1 + x2) / 2)
+    cy = int((y1 + y2) / 2)
+    return roi_x <= cx <= roi_x+roi_w and roi_y <= cy <= roi_y+roi_h
+
+
+def extract_detections(result, names, offset=(0, 0)):
+    """
+    YOLO 결과 하나를 탐지 튜플 리스트로 변환.
+    박스 좌표는 입력 이미지 기준이므로 offset(ROI 좌상단)을 더해 프레임 좌표로 변환.
+    """
+    offset_x, offset_y = offset
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = map(int, box.xyxy[0])  # 박스 좌표
+        conf = float(box.conf[0])                # 신뢰도
+        cls = int(box.cls[0])                   # 클래스 ID
+        detections.append((x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y,
+                           conf, names[cls], None))
+    return detections
+
+
+def predict(model, inputs, **kwargs):
+    """모델 추론. 분할 모델이면 마스크 디코딩을 건너뛰는 predictor 사용"""
+    if getattr(model, 'task', None) != 'segment':
+        return model(inputs, **kwargs)
+
+    from masks import LazyMaskPredictor
+    # 다른 경로(model(...))로 기본 predictor가 먼저 만들어졌으면 교체
+    if not isinstance(model.predictor, LazyMaskPredictor):
+        model.predictor = None
+    return model.predict(inputs, predictor=LazyMaskPredictor, **kwargs)
+
+
+def detection_areas(result, detections, roi):
+    """ROI 안 탐지만 마스크 면적 계산 -> {(x1, y1, x2, y2): 면적(픽셀)}"""
+    from masks import mask_areas
+
+    indices = [i for i, (x1, y1, x2, y2, *_) in enumerate(detections) if in_roi(roi, x1, y1, x2, y2)]
+    areas = mask_areas(result, indices)
+    if areas is None:
+        return {}
+    return {detections[i][:4]: area for i, area in zip(indices, areas)}
+
+
+def run_batch(model, inputs, offsets, conf=0.7, imgsz=None, area_rois=None):
+    """
+    여러 이미지를 한 번의 배치 추론으로 처리.
+    :param inputs: 이미지 리스트 (전체 프레임 또는 ROI)
+    :param offsets: 이미지별 프레임 좌표 오프셋 (x, y) 리스트
+    :param area_rois: 이미지별 ROI 리스트. 주면 ROI 안 탐지의 마스크 면적도 계산
+    :return: 이미지별 탐지 튜플 리스트 (입력 순서 그대로)
+             area_rois를 주면 (탐지 리스트, 이미지별 {박스: 면적} 리스트)
+    """
+    # verbose 옵션을 False로 설정하여 불필요한 출력 방지
+    kwargs = {'conf': conf, 'verbose': False}
+    if imgsz is not None:
+        kwargs['imgsz'] = imgsz
+    results = predict(model, inputs, **kwargs)
+    all_detections = [extract_detections(result, model.names, offset)
+                      for result, offset in zip(results, offsets)]
+    if area_rois is None:
+        return all_detections
+
+    all_areas = [detection_areas(result, detections, roi)
+                 for result, detections, roi in zip(results, all_detections, area_rois)]
+    return all_detections, all_areas
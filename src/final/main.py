@@ -1,145 +1,632 @@
 import cv2
-from ultralytics import YOLO
+import os
+import signal
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import matplotlib.pyplot as plt
-import pandas as pd
 from datetime import datetime
 import subprocess
+import sys
 import webbrowser
+import threading
+import queue
+import time
+from event_store import AsyncEventWriter
+from tracker import BoxTracker
+from gate import ChangeGate
+from inference import crop_roi, in_roi, run_batch
+from display import FrameView
+from pacing import AdaptivePacer
+from snapshot_store import SnapshotArchive
+from frame_share import FrameRing, INSPECTOR_STREAMS_FILE, ring_name, save_streams
+import metrics
+from metrics import histogram, timed
 
 # yolo 모델 학습 커맨드
 # yolo detect train data=data.yaml model=yolov8n.pt epochs=50 imgsz=640
 # yolo detect train data=data.yaml model=yolov8n-seg.pt epochs=100 imgsz=640
 
-# ======= YOLO 모델 불러오기 (예: ultralytics YOLOv8) =======
-model = YOLO("best.pt")  
-
-# ROI 좌표 예시 (x, y, w, h)
-ROI_X, ROI_Y, ROI_W, ROI_H = 200, 150, 300, 300
+# ======= 카메라 설정 =======
+# 카메라별 ID, 영상 소스(웹캠 번호 또는 영상 경로), ROI 좌표 (x, y, w, h)
+# 여러 라인을 한 PC에서 검사할 때 항목을 추가하면 한 번의 배치 추론으로 같이 처리됨
+CAMERAS = [
+    {"id": "cam0", "source": 0, "roi": (200, 150, 300, 300)},
+    # {"id": "cam1", "source": 1, "roi": (200, 150, 300, 300)},
+]
+
+# 추론 백엔드
+# "torch"    : best.pt를 PyTorch로 실행
+# "onnx"     : ONNX Runtime (처음 실행할 때 best.onnx로 변환)
+# "openvino" : OpenVINO (처음 실행할 때 best_openvino_model로 변환, 인텔 CPU에서 가장 빠름)
+# BACKEND_INT8 : CALIB_DIR 이미지로 보정해서 INT8 양자화
+# PARITY_CHECK : 시작할 때 PyTorch 결과와 비교해서 허용 오차를 넘으면 PyTorch로 실행
+BACKEND = "torch"
+BACKEND_INT8 = False
+PARITY_CHECK = True
+
+# 추론 모드
+# "full" : 전체 프레임으로 추론한 뒤 ROI 밖의 박스는 버림
+# "roi"  : ROI 영역만 잘라서 추론 (ROI 밖 픽셀은 모델에 넣지 않음)
+INFERENCE_MODE = "roi"
+ROI_IMGSZ = 320  # "roi" 모드에서 모델 입력 크기 (32의 배수)
+
+# 결함 면적 표시 (분할 모델)
+# False : 박스만 사용 (마스크 계산 안 함)
+# True  : ROI 안 탐지만 마스크를 저해상도로 계산해서 면적(픽셀)을 라벨에 표시
+MASK_AREA = False
+
+# 자동 기록 모드
+# True  : ROI 안에서 탐지된 결함을 모두 자동으로 기록 (스페이스바 수동 기록도 가능)
+# False : 스페이스바를 누를 때만 기록
+# 같은 카메라에서 같은 클래스가 AUTO_LOG_DEBOUNCE초 이상 끊김 없이 계속 보이면 같은 물건으로 보고 한 번만 기록
+AUTO_LOG = True
+AUTO_LOG_DEBOUNCE = 2.0
+
+# 결함 스냅샷 (기록한 결함마다 ROI 이미지 + 박스를 그린 프레임을 snapshots/에 저장, 대시보드 최근 검출 내역에서 확인)
+# 저장은 백그라운드 스레드 풀에서 하고, 전체 크기가 SNAPSHOT_MAX_BYTES를 넘으면 오래된 것부터 삭제
+SNAPSHOTS = True
+SNAPSHOT_MAX_BYTES = 2 * 1024 ** 3
+
+# 추적 모드
+# True  : DETECT_INTERVAL 프레임마다(또는 추적이 불안정할 때) YOLO를 실행하고,
+#         그 사이 프레임은 광류 추적으로 박스를 이동. 추적 ID가 붙은 물건은 한 번만 기록
+# False : 매 프레임 YOLO 실행
+TRACKING = True
+DETECT_INTERVAL = 5
+
+# 적응형 조절 (목표 결정 지연)
+# 캡처 -> 결과(자동 기록/표시)까지 걸린 시간이 LATENCY_TARGET초를 넘으면 PACING_LEVELS의 다음 단계로 낮추고,
+# 한 단계 올려도 목표 안에 들어올 만큼 여유가 있으면 다시 올림 (현재 단계는 화면 왼쪽 위와 /metrics에 표시)
+# PACING_LEVELS : (모델 입력 크기, 검출 간격) 품질 높은 순, 입력 크기는 32의 배수
+# ADAPTIVE = False면 첫 단계로 고정 (캡처 디코딩 주기 조절은 그대로 사용)
+ADAPTIVE = True
+LATENCY_TARGET = 0.15
+PACING_LEVELS = ([(ROI_IMGSZ, DETECT_INTERVAL), (256, 8), (192, 12)] if INFERENCE_MODE == "roi"
+                 else [(640, DETECT_INTERVAL), (480, 8), (320, 12)])
+
+# 변화 감지 게이트 (프로토타입의 check_defect/템플릿 매칭 재사용)
+# ROI에 제품이 없거나(기준 이미지와 템플릿 매칭 실패) 마지막 추론 후 변화가 없으면
+# 추론을 건너뛰고 마지막 결과를 재사용
+GATE = True
+# 제품 기준 이미지 (프로토타입과 같은 파일, 없으면 제품 유무 판단 생략, 카메라별 "baseline"으로 변경 가능)
+GATE_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prototypes", "baseline.jpg")
+GATE_CHANGE_THRESHOLD = 6.0      # 마지막 추론 ROI와의 평균 HSV 차이가 이 값 이하면 변화 없음
+GATE_MATCH_THRESHOLD = 0.5       # 템플릿 매칭 유사도 기준
+
+# 화면 표시
+# 프레임을 DISPLAY_WIDTH 너비로 줄인 뒤에 오버레이/색 변환 (None이면 원본 크기로 표시)
+# 화면 갱신은 DISPLAY_FPS로 제한해서 추론과 CPU를 나눠 쓰지 않게 함 (None이면 제한 없음)
+DISPLAY_WIDTH = 640
+DISPLAY_FPS = 15
+
+# 대시보드 실행 방식
+# "thread"  : 검사 프로그램 안에서 스레드로 실행 (별도 파이썬을 새로 띄우지 않음)
+# "process" : flask_app.py를 별도 프로세스로 실행
+# DASHBOARD_PREWARM : 모델 준비가 끝나면 대시보드를 미리 띄워둠 (첫 클릭부터 바로 열림)
+DASHBOARD_MODE = "thread"
+DASHBOARD_PREWARM = True
+DASHBOARD_URL = "http://127.0.0.1:5000/log"
+
+# 헤드리스 모드 (창 없이 캡처/추론만 실행, 데스크톱 세션이 없는 무인 라인 PC용)
+# python main.py --headless 로 실행하면 켜짐. 대시보드를 바로 띄우고 영상은 대시보드 /live 에서 확인
+# FRAME_SHARE : 오버레이를 그린 프레임을 공유 메모리로 대시보드에 넘김 (창이 있을 때도 /live 사용 가능)
+HEADLESS = "--headless" in sys.argv
+FRAME_SHARE = True
+DASHBOARD_HOST = "127.0.0.1"  # 다른 PC에서 대시보드를 보려면 "0.0.0.0"
 
 # ======= Tkinter GUI 설정 =======
-root = tk.Tk()
-root.title("Defect Detection")
-
-# 영상 표시 레이블
-tk_label = tk.Label(root)
-tk_label.pack()
+# 헤드리스 모드는 창을 만들지 않음
+if HEADLESS:
+    root = None
+else:
+    root = tk.Tk()
+    root.title("Defect Detection")
+
+    # 영상 표시 영역 (카메라별 레이블을 가로로 배치)
+    video_frame = tk.Frame(root)
+    video_frame.pack()
+
+
+def load_baseline(path, camera_id):
+    """변화 감지 게이트의 제품 기준 이미지 (없으면 경고 후 None: 제품 유무 판단 없이 변화 감지만 사용)"""
+    image = cv2.imread(path) if os.path.exists(path) else None
+    if image is None and GATE:
+        print(f"[{camera_id}] Warning: gate baseline '{path}' not found - presence gate disabled (empty ROI is not skipped)")
+    return image
+
+# ======= 카메라 초기화 =======
+# 카메라별 상태
+# cap: VideoCapture, frame_queue: 캡처 -> 추론, result_queue: 추론 -> UI
+# label: 영상 표시 레이블 (헤드리스 모드는 None), frame: 마지막으로 표시한 프레임, view: 표시 버퍼, next_display: 다음 화면 갱신 시각, defected: 현재 탐지된 결함 (x1, y1, x2, y2, conf, tag, track_id)
+# last_seen: 클래스별 마지막 탐지 시각 (추적 모드가 아닐 때 자동 기록 중복 방지)
+# tracker: 추적기, frames_since_detect: 마지막 YOLO 실행 후 지난 프레임 수, logged_tracks: 기록한 트랙 ID
+# gate: 변화 감지 게이트, areas: 트랙 ID(없으면 박스)별 결함 면적 (MASK_AREA)
+cameras = []
+for cam_config in CAMERAS:
+    cap = cv2.VideoCapture(cam_config["source"])
+
+    if not cap.isOpened():
+        print(f"웹캠을 열 수 없습니다. ({cam_config['id']})")
+        exit()
+
+    tk_label = None
+    if not HEADLESS:
+        tk_label = tk.Label(video_frame)
+        tk_label.pack(side=tk.LEFT)
+
+    cameras.append({
+        "id": cam_config["id"],
+        "roi": cam_config["roi"],
+        "cap": cap,
+        "frame_queue": queue.Queue(maxsize=1),
+        "result_queue": queue.Queue(maxsize=1),
+        "label": tk_label,
+        "view": FrameView(tk_label, max_width=DISPLAY_WIDTH),
+        "next_display": 0.0,
+        "defected": None,
+        "frame": None,
+        "last_seen": {},
+        "tracker": BoxTracker(),
+        "frames_since_detect": 0,
+        "logged_tracks": set(),
+        "areas": {},
+        "gate": ChangeGate(load_baseline(cam_config.get("baseline", GATE_BASELINE), cam_config["id"]),
+                           change_threshold=GATE_CHANGE_THRESHOLD,
+                           match_threshold=GATE_MATCH_THRESHOLD),
+    })
+
+# 단계별 처리 시간 측정 -> 캡처 주기 / 입력 크기 / 검출 간격 조절
+pacer = AdaptivePacer(PACING_LEVELS if ADAPTIVE else PACING_LEVELS[:1], LATENCY_TARGET)
+
+# 결함 이벤트 기록기 (defect_events/, 일자별 파티션)
+# 백그라운드 스레드에서 모아서 기록하므로 UI/추론 스레드가 파일 쓰기를 기다리지 않음
+event_writer = AsyncEventWriter()
+# 결함 스냅샷 저장기 (JPEG 인코딩/저장을 스레드 풀에서 처리, 밀리면 버림)
+snapshot_archive = SnapshotArchive(max_bytes=SNAPSHOT_MAX_BYTES) if SNAPSHOTS else None
 
+# 안내문구
+DEFAULT_INFO_TEXT = ("Auto logging to defect_events (SPACE: log now)" if AUTO_LOG
+                     else "Press SPACE to save current status to defect_events")
+LOADING_INFO_TEXT = "Loading model..."
+info_text = LOADING_INFO_TEXT
+info_color = (0, 255, 255)
 
-# 웹캠 초기화
-cap = cv2.VideoCapture(0)
 
-if not cap.isOpened():
-    print("웹캠을 열 수 없습니다.")
-    exit()
+# ======= YOLO 모델 불러오기 (예: ultralytics YOLOv8) =======
+# 모델 import/로드/변환/워밍업은 수 초가 걸리므로 창을 먼저 띄우고 백그라운드 스레드에서 진행
+# 준비되기 전까지는 영상만 표시하고 추론은 하지 않음
+MODEL_IMGSZ = PACING_LEVELS[0][0]
+model = None
+model_ready = threading.Event()
+
+def load_inspector_model():
+    """모델 로드 -> (PyTorch 결과 비교) -> 워밍업 후 model_ready 설정"""
+    global model, info_text, info_color
+    try:
+        # ultralytics(torch) import가 가장 오래 걸리므로 여기서 처음 import
+        from ultralytics import YOLO
+        from backend import CALIB_DIR, check_parity, load_images, load_model, warmup
+
+        loaded = load_model("best.pt", BACKEND, imgsz=MODEL_IMGSZ, int8=BACKEND_INT8)
+
+        if BACKEND != "torch" and PARITY_CHECK:
+            parity_ok, parity_report = check_parity(loaded, YOLO("best.pt"), load_images(CALIB_DIR),
+                                                    imgsz=MODEL_IMGSZ)
+            print(parity_report)
+            if not parity_ok:
+                print(f"{BACKEND} 결과가 PyTorch와 달라서 PyTorch로 실행합니다.")
+                loaded = YOLO("best.pt")
+
+        # 첫 프레임(과 단계를 바꾼 직후) 지연을 없애기 위해 단계별 입력 크기, 카메라 수만큼의 배치로 미리 추론
+        for imgsz in sorted({imgsz for imgsz, _ in pacer.levels}):
+            warmup(loaded, imgsz, batch=len(CAMERAS))
+    except Exception as e:
+        print(f"모델을 불러올 수 없습니다: {e}")
+        info_text = "Model load failed (see console)"
+        info_color = (0, 0, 255)
+        return
 
-# 안내문구
-info_text = "Press SPACE to save current status to defect_log.txt"
-info_color = (255, 255, 0)
+    model = loaded
+    model_ready.set()
+    info_text = DEFAULT_INFO_TEXT
+    info_color = (255, 255, 0)
 
-# 전역 변수로 탐지된 라벨 저장
-defected_labels = None
+    if DASHBOARD_PREWARM:
+        start_dashboard()
 
 
 # ======= Flask 서버로 로그 표시 =======
 
-# 플라스크 서버 프로세스 관리 변수
-flask_process = None
-
-def show_defect_log():
-    global flask_process
-    if flask_process is None or flask_process.poll() is not None:
+# 플라스크 서버 관리 변수
+flask_process = None   # "process" 모드
+flask_thread = None    # "thread" 모드
+flask_ready = threading.Event()
+
+def run_dashboard():
+    """대시보드 서버를 이 프로세스 안에서 실행 (pandas/matplotlib은 여기서 처음 import)"""
+    import flask_app
+    # spawn한 차트 렌더링 프로세스는 main.py를 다시 실행하게 되므로 검사 프로그램 안에서는 스레드로 렌더링
+    flask_app.CHART_PROCESSES = 0
+    flask_ready.set()
+    flask_app.serve(host=DASHBOARD_HOST, port=5000)
+
+def start_dashboard():
+    """대시보드 서버가 실행 중이 아니면 시작"""
+    global flask_process, flask_thread
+    if DASHBOARD_MODE == "thread":
+        if flask_thread is None:
+            flask_thread = threading.Thread(target=run_dashboard, daemon=True)
+            flask_thread.start()
+    elif flask_process is None or flask_process.poll() is not None:
         # Flask 서버 실행 (flask_app.py)
-        flask_process = subprocess.Popen(["python", "flask_app.py"])
-    webbrowser.open("http://127.0.0.1:5000/log")
-
-btn = ttk.Button(root, text="Show Defect Detection Dashboard", command=show_defect_log, takefocus=0)
-btn.pack(pady=10)
+        flask_process = subprocess.Popen([sys.executable, "flask_app.py", "--host", DASHBOARD_HOST])
 
-# ======= 프레임 처리 함수 =======
-def process_frame():
-    global defected_labels
+def open_dashboard():
+    """서버가 준비되면 브라우저로 대시보드 열기 ("thread" 모드는 import가 끝날 때까지 기다림)"""
+    if DASHBOARD_MODE == "thread" and not flask_ready.is_set():
+        root.after(100, open_dashboard)
+        return
+    webbrowser.open(DASHBOARD_URL)
 
-    ret, frame = cap.read()
-    if not ret:
-        root.after(10, process_frame)
+def show_defect_log():
+    start_dashboard()
+    open_dashboard()
+
+if not HEADLESS:
+    btn = ttk.Button(root, text="Show Defect Detection Dashboard", command=show_defect_log, takefocus=0)
+    btn.pack(pady=10)
+
+# ======= 파이프라인 큐 =======
+# 캡처 스레드(카메라별) -> 추론 스레드(배치) -> UI(Tk) 순서로 프레임이 흐름
+# 큐 크기를 1로 두고 가득 차면 오래된 항목을 버려서 항상 가장 최신 프레임만 처리
+stop_event = threading.Event()
+frame_ready = threading.Event()  # 새 프레임이 들어오면 추론 스레드를 깨움
+
+def put_latest(q, item):
+    """큐가 가득 차 있으면 가장 오래된 항목을 버리고 새 항목을 넣음"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+# ======= 캡처 스레드 =======
+def capture_loop(camera):
+    """
+    카메라 프레임을 계속 읽어서 카메라의 frame_queue에 (최신 프레임, 캡처 시각)만 넣음.
+    grab()은 매 프레임 해서 카메라 버퍼에 오래된 프레임이 쌓이지 않게 하고,
+    디코딩(retrieve)은 추론 스레드가 처리할 수 있는 주기(pacer.frame_interval)로만 함.
+    """
+    next_decode = 0.0
+    while not stop_event.is_set():
+        with timed("camera_read"):
+            ret = camera["cap"].grab()
+        if not ret:
+            time.sleep(0.01)
+            continue
+
+        captured_at = time.perf_counter()
+        if captured_at < next_decode:
+            continue  # 추론이 아직 이전 프레임을 처리 중 (디코딩해도 큐에서 버려짐)
+        with timed("camera_decode"):
+            ret, frame = camera["cap"].retrieve()
+        if not ret:
+            continue
+        next_decode = captured_at + pacer.frame_interval()
+
+        with timed("flip"):
+            frame = cv2.flip(frame, 1)  # 좌우 반전
+        put_latest(camera["frame_queue"], (frame, captured_at))
+        frame_ready.set()
+
+# ======= YOLO 추론 =======
+def run_inference(frames, rois):
+    """
+    여러 카메라의 프레임을 한 번의 배치 추론으로 처리.
+    :param frames: 카메라별 프레임 리스트
+    :param rois: 카메라별 ROI (x, y, w, h) 리스트
+    :return: 카메라별 프레임 좌표 기준 (x1, y1, x2, y2, conf, tag, track_id) 리스트 (track_id는 None)
+             MASK_AREA면 (탐지 리스트, 카메라별 {박스: 면적} 리스트)
+    """
+    area_rois = rois if MASK_AREA else None
+    # 결과는 입력 순서대로 반환되므로 같은 순서로 카메라에 돌려줌
+    if INFERENCE_MODE == "roi":
+        # ROI 영역만 잘라서 작은 입력 크기로 추론
+        inputs = [crop_roi(frame, roi) for frame, roi in zip(frames, rois)]
+        offsets = [(x, y) for x, y, _, _ in rois]
+        return run_batch(model, inputs, offsets, conf=0.7, imgsz=pacer.imgsz, area_rois=area_rois)
+    return run_batch(model, frames, [(0, 0)] * len(frames), conf=0.7, imgsz=pacer.imgsz, area_rois=area_rois)
+
+# ======= 자동 기록 =======
+def log_defect(camera, frame, detection, timestamp):
+    """결함 하나를 이벤트로 기록하고 스냅샷 저장 예약 (둘 다 백그라운드에서 처리)"""
+    x1, y1, x2, y2, conf, tag, _ = detection
+    event_writer.append(tag, conf, box=(x1, y1, x2, y2), camera=camera["id"], timestamp=timestamp)
+    if snapshot_archive is not None and frame is not None:
+        snapshot_archive.submit(frame, camera["roi"], detection, camera["id"], timestamp)
+
+def auto_log(camera, frame, detections):
+    """ROI 안의 탐지 결과를 자동 기록 (같은 물건이 계속 보이는 동안은 한 번만)"""
+    now = time.time()
+    for detection in detections:
+        x1, y1, x2, y2, conf, tag, track_id = detection
+        if not in_roi(camera["roi"], x1, y1, x2, y2):
+            continue
+
+        if track_id is not None:
+            # 추적 ID별로 한 번만 기록
+            if track_id in camera["logged_tracks"]:
+                continue
+            camera["logged_tracks"].add(track_id)
+        else:
+            last_seen = camera["last_seen"].get(tag)
+            camera["last_seen"][tag] = now
+            if last_seen is not None and now - last_seen < AUTO_LOG_DEBOUNCE:
+                continue  # 같은 물건이 계속 보이는 중
+
+        log_defect(camera, frame, detection, now)
+
+    # 사라진 트랙 ID는 정리
+    if TRACKING:
+        camera["logged_tracks"] &= camera["tracker"].track_ids()
+
+# ======= 추적 =======
+def tracking_view(camera, frame):
+    """추적에 사용할 흑백 영상과 그 영역의 프레임 좌표 (ROI 모드는 ROI만 사용)"""
+    if INFERENCE_MODE == "roi":
+        x, y, _, _ = camera["roi"]
+        return cv2.cvtColor(crop_roi(frame, camera["roi"]), cv2.COLOR_BGR2GRAY), (x, y)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (0, 0)
+
+def needs_detection(camera):
+    """이번 프레임에 YOLO를 실행해야 하는지 확인"""
+    return (not TRACKING or camera["tracker"].lost
+            or camera["frames_since_detect"] >= pacer.detect_interval - 1)
+
+def publish_result(camera, frame, detections, captured_at):
+    """탐지/추적 결과를 기록하고 UI로 넘김 (캡처 -> 결과까지의 결정 지연 기록)"""
+    latency = time.perf_counter() - captured_at
+    histogram("decision_latency").observe(latency)
+    pacer.observe_latency(latency)
+
+    camera["gate"].last_result = detections
+    if AUTO_LOG:
+        auto_log(camera, frame, detections)
+    put_latest(camera["result_queue"], (frame, detections))
+
+# ======= 추론 스레드 =======
+def process_cycle():
+    """카메라별 최신 프레임 한 장씩 처리 (게이트 -> 추적 또는 배치 추론 -> publish_result)"""
+    # 새 프레임이 있는 카메라 중 검출이 필요한 카메라만 이번 배치에 포함
+    # 나머지는 추적기로 박스만 이동
+    batch_cameras, batch_frames, batch_times = [], [], []
+    for camera in cameras:
+        try:
+            frame, captured_at = camera["frame_queue"].get_nowait()
+        except queue.Empty:
+            continue
+
+        # 제품이 없거나 변화가 없으면 추론 생략
+        if GATE:
+            with timed("gate"):
+                decision = camera["gate"].check(crop_roi(frame, camera["roi"]))
+            if decision == "empty":
+                # 이전 물건의 트랙을 지워서 같은 자리에 멈춘 다음 물건이 이전 ID(기록 완료)를 이어받지 않도록 함
+                camera["tracker"].reset()  # 제품이 다시 들어오면 바로 검출
+                camera["logged_tracks"].clear()
+                publish_result(camera, frame, [], captured_at)
+                continue
+            if decision == "static":
+                publish_result(camera, frame, camera["gate"].last_result, captured_at)
+                continue
+
+        if needs_detection(camera):
+            batch_cameras.append(camera)
+            batch_frames.append(frame)
+            batch_times.append(captured_at)
+        else:
+            with timed("tracking"):
+                gray, origin = tracking_view(camera, frame)
+                detections = camera["tracker"].propagate(gray, origin)
+            camera["frames_since_detect"] += 1
+            publish_result(camera, frame, detections, captured_at)
+
+    if not batch_frames:
         return
 
+    with timed("inference"):
+        all_detections = run_inference(batch_frames, [camera["roi"] for camera in batch_cameras])
+    if MASK_AREA:
+        all_detections, all_areas = all_detections
+    else:
+        all_areas = [{}] * len(batch_cameras)
+    for camera, frame, captured_at, detections, areas in zip(batch_cameras, batch_frames, batch_times,
+                                                             all_detections, all_areas):
+        camera["gate"].remember(crop_roi(frame, camera["roi"]))
+        if TRACKING:
+            # 검출 결과에 추적 ID 부여
+            with timed("tracking"):
+                gray, origin = tracking_view(camera, frame)
+                detections = camera["tracker"].update(gray, origin, detections)
+            camera["frames_since_detect"] = 0
+        if MASK_AREA:
+            # 추적 ID가 붙으면 ID 기준으로 저장해서 추적 프레임에서도 면적 표시
+            camera["areas"] = {(track_id if track_id is not None else (x1, y1, x2, y2)): areas[(x1, y1, x2, y2)]
+                               for x1, y1, x2, y2, _, _, track_id in detections
+                               if (x1, y1, x2, y2) in areas}
+        publish_result(camera, frame, detections, captured_at)
+
+def inference_loop():
+    """각 카메라의 최신 프레임을 모아 배치 추론 후 카메라별 result_queue에 (프레임, 탐지 결과)를 넣음"""
+    while not stop_event.is_set():
+        if not frame_ready.wait(timeout=0.1):
+            continue
+        frame_ready.clear()
+
+        # 모델 준비 전에는 영상만 표시
+        if not model_ready.is_set():
+            for camera in cameras:
+                try:
+                    frame, _ = camera["frame_queue"].get_nowait()
+                    put_latest(camera["result_queue"], (frame, []))
+                except queue.Empty:
+                    pass
+            continue
+
+        # 한 주기(게이트/추적/추론) 처리 시간 -> 캡처 디코딩 주기
+        cycle_started = time.perf_counter()
+        process_cycle()
+        pacer.observe("cycle", time.perf_counter() - cycle_started)
+
+        # 결정 지연이 목표를 넘으면 입력 크기/검출 간격 조절
+        if pacer.adjust():
+            print(f"처리 모드 변경: {pacer.mode()}")
+        metrics.set_gauges(pacer.gauges())
+
+# ======= 프레임 공유 (대시보드 라이브 영상) =======
+frame_rings = {}            # 카메라 ID -> FrameRing
+started_at = time.time()    # 대시보드가 인스펙터 재시작을 알아채는 데 사용
+
+def share_frame(camera, annotated_frame):
+    """오버레이를 그린 프레임을 카메라의 공유 메모리 링 버퍼에 씀 (첫 프레임 크기로 버퍼 생성)"""
+    ring = frame_rings.get(camera["id"])
+    if ring is None:
+        ring = frame_rings[camera["id"]] = FrameRing.create(ring_name(camera["id"]), annotated_frame.shape)
+        save_streams(frame_rings, started_at)
+    ring.write(annotated_frame)
+
+def close_frame_rings():
+    """공유 메모리 삭제 후 대시보드가 더 이상 붙지 않도록 공유 파일도 삭제"""
+    for ring in frame_rings.values():
+        ring.close()
+    if frame_rings:
+        try:
+            os.remove(INSPECTOR_STREAMS_FILE)
+        except FileNotFoundError:
+            pass
+
+# ======= 프레임 처리 함수 (UI 스레드, 헤드리스 모드는 메인 스레드) =======
+def draw_camera(camera, frame, detections):
+    """카메라 프레임에 ROI와 탐지 결과를 그리고 레이블 갱신/대시보드 공유"""
+    view = camera["view"]
+    roi_x, roi_y, roi_w, roi_h = camera["roi"]
+
+    # 표시 크기로 먼저 줄이고 그 위에 그림 (재사용 버퍼)
+    with timed("resize"):
+        annotated_frame = view.prepare(frame)
+
     # ROI 표시
-    frame = cv2.flip(frame, 1)  # 좌우 반전
-    cv2.rectangle(frame, (ROI_X, ROI_Y), (ROI_X+ROI_W, ROI_Y+ROI_H), (255,0,0), 2)
-    cv2.putText(frame, info_text, (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, info_color, 2)
-
-    # YOLO 추론
-    # verbose 옵션을 False로 설정하여 불필요한 출력 방지
-    results = model(frame, conf=0.7, verbose=False)
-    annotated_frame = frame.copy()
-
-    defected_labels = None  # 매 프레임마다 초기화
-
-    for result in results[0].boxes:
-        x1, y1, x2, y2 = map(int, result.xyxy[0])  # 박스 좌표
-        conf = float(result.conf[0])                # 신뢰도
-        cls = int(result.cls[0])                   # 클래스 ID
-        tag = model.names[cls]
-        # print(tag)
-        defected_labels = tag + f"({conf:.2f})"
-
-        # 바운딩 박스 중심 좌표
-        cx = int((x1 + x2) / 2)
-        cy = int((y1 + y2) / 2)
-
-        # ROI 내부에 있는지 확인
-        if ROI_X <= cx <= ROI_X+ROI_W and ROI_Y <= cy <= ROI_Y+ROI_H:
-            # ROI 내부라면 박스 표시
-            # 클래스별 색상 지정
-            if tag == "contaminated":
-                rec_color = (255, 0, 255)   # 보라색 (BGR)
-            elif tag == "tearing":
-                rec_color = (0, 0, 255)     # 빨간색 (BGR)
-            else:
-                rec_color = (0, 255, 0)     # 기본 녹색 (BGR)
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), rec_color, 2)
-
-            cv2.putText(annotated_frame, f"{tag} {conf:.2f}", 
-                        (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 
-                        0.6, rec_color, 2)
+    with timed("overlay"):
+        cv2.rectangle(annotated_frame, view.point(roi_x, roi_y), view.point(roi_x+roi_w, roi_y+roi_h), (255,0,0), 2)
+        cv2.putText(annotated_frame, info_text, (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, info_color, 2)
+        cv2.putText(annotated_frame, f'{camera["id"]}  {pacer.mode()}', (10,60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,0,0), 2)
+
+    camera["defected"] = None  # 매 프레임마다 초기화
+    camera["frame"] = frame    # 스페이스바 기록 시 스냅샷용
+
+    with timed("box_loop"):
+        for detection in detections:
+            x1, y1, x2, y2, conf, tag, track_id = detection
+            # print(tag)
+            camera["defected"] = detection
+
+            # ROI 내부에 있는지 확인 (바운딩 박스 중심 기준)
+            if in_roi(camera["roi"], x1, y1, x2, y2):
+                # ROI 내부라면 박스 표시
+                # 클래스별 색상 지정
+                if tag == "contaminated":
+                    rec_color = (255, 0, 255)   # 보라색 (BGR)
+                elif tag == "tearing":
+                    rec_color = (0, 0, 255)     # 빨간색 (BGR)
+                else:
+                    rec_color = (0, 255, 0)     # 기본 녹색 (BGR)
+                top_left = view.point(x1, y1)
+                cv2.rectangle(annotated_frame, top_left, view.point(x2, y2), rec_color, 2)
+
+                label = f"{tag} {conf:.2f}" if track_id is None else f"#{track_id} {tag} {conf:.2f}"
+                area = camera["areas"].get(track_id if track_id is not None else (x1, y1, x2, y2))
+                if area is not None:
+                    label += f" {area}px"
+                cv2.putText(annotated_frame, label,
+                            (top_left[0], top_left[1] - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.6, rec_color, 2)
 
     # 결과 화면 출력
     # cv2.imshow("Packaging Defect Inspection (ROI)", annotated_frame)
 
-    # OpenCV BGR -> RGB 변환
-    cv2image = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
-    img = Image.fromarray(cv2image)
-    imgtk = ImageTk.PhotoImage(image=img)
+    # 대시보드 라이브 영상으로 공유 (JPEG 인코딩은 보는 사람이 있을 때 대시보드에서 한 번만)
+    if FRAME_SHARE:
+        with timed("frame_share"):
+            share_frame(camera, annotated_frame)
+    if HEADLESS:
+        return
 
-    # Tkinter 레이블 업데이트
-    tk_label.imgtk = imgtk
-    tk_label.configure(image=imgtk)
+    # OpenCV BGR -> RGB 변환 (미리 만든 버퍼에 덮어씀)
+    with timed("convert"):
+        view.to_rgb(annotated_frame)
+
+    # Tkinter 레이블 업데이트 (PhotoImage 하나를 계속 갱신)
+    with timed("tk_update"):
+        view.update()
+
+def display_results():
+    # 추론이 끝난 최신 결과가 있는 카메라만 다시 그림
+    # 화면 갱신 주기(DISPLAY_FPS)가 안 된 카메라는 결과를 큐에 남겨둠 (다음에 최신 결과로 그림)
+    now = time.perf_counter()
+    for camera in cameras:
+        if now < camera["next_display"]:
+            continue
+        try:
+            frame, detections = camera["result_queue"].get_nowait()
+        except queue.Empty:
+            continue
+        if DISPLAY_FPS:
+            camera["next_display"] = now + 1.0 / DISPLAY_FPS
+        draw_camera(camera, frame, detections)
+
+def next_poll_delay():
+    """
+    다음 결과 확인까지 기다릴 시간 (초).
+    가장 빠른 카메라의 다음 화면 갱신 시각까지 기다리고, 그 뒤로는 추론 한 주기의 1/4마다 확인 (5~50ms)
+    """
+    wait = min(camera["next_display"] for camera in cameras) - time.perf_counter()
+    return max(wait, min(max(pacer.frame_interval() / 4, 0.005), 0.05))
 
-    root.after(10, process_frame)  # 약 100FPS 갱신
+def process_frame():
+    display_results()
+    root.after(max(int(next_poll_delay() * 1000), 1), process_frame)
+
+def headless_loop():
+    """창 없이 새 추론 결과를 그려서 대시보드로만 공유 (Ctrl+C 또는 종료 신호로 종료)"""
+    print(f"헤드리스 모드로 실행 중입니다. 라이브 영상: {DASHBOARD_URL.rsplit('/', 1)[0]}/live (종료: Ctrl+C)")
+    try:
+        while not stop_event.wait(next_poll_delay()):
+            display_results()
+    except KeyboardInterrupt:
+        pass
 
 # ======= 스페이스바 로그 기록 =======
 def on_key(event):
-    global info_text, info_color, defected_labels
+    global info_text, info_color
 
     # 스페이스 키 누르면 기록
-    # defected_labels가 None이 아닐 때
+    # 카메라별 defected가 None이 아닐 때
     if event.keysym == "space":
-        if defected_labels is not None:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # 결함 객체 결과 수집
-            with open("defect_log.txt", "a", encoding="utf-8") as f:
-                f.write(f"{now}, {defected_labels}\n")
+        logged_cameras = [camera for camera in cameras if camera["defected"] is not None]
+        if logged_cameras:
+            now = datetime.now()
 
-            defected_labels = None  # 기록 후 초기화
+            # 결함 객체 결과 수집 (시각, 클래스, 신뢰도, 박스, 카메라 ID) + 스냅샷
+            for camera in logged_cameras:
+                log_defect(camera, camera["frame"], camera["defected"], now.timestamp())
+                camera["defected"] = None  # 기록 후 초기화
 
 
             # 1초 동안 안내 메시지
-            temp_text = f"Logged at {now}"
+            temp_text = f"Logged at {now:%Y-%m-%d %H:%M:%S}"
             info_text = temp_text
             # 초록색으로 변경
             info_color = (0, 255, 0)
@@ -147,14 +634,75 @@ def on_key(event):
 
 def restore_info_text():
     global info_text, info_color
-    info_text = "Press SPACE to save current status to defect_log.txt"
-    info_color = (255, 255, 0)
-
-root.bind("<Key>", on_key)
+    if model_ready.is_set():
+        info_text = DEFAULT_INFO_TEXT
+        info_color = (255, 255, 0)
+    else:
+        info_text = LOADING_INFO_TEXT
+        info_color = (0, 255, 255)
+
+if not HEADLESS:
+    root.bind("<Key>", on_key)
+
+# ======= 처리 시간 공유 =======
+def metrics_loop():
+    """단계별 처리 시간을 1초마다 파일로 저장 (대시보드 /metrics에서 읽음)"""
+    while not stop_event.wait(1.0):
+        try:
+            metrics.save_snapshot()
+        except OSError as e:
+            print(f"Error saving metrics: {e}")
+
+# ======= 종료 처리 =======
+def on_close():
+    """창을 닫으면 캡처/추론 스레드를 먼저 멈춘 뒤 종료"""
+    stop_event.set()
+    root.destroy()
+
+if HEADLESS:
+    # 서비스로 실행할 때 종료 신호를 받으면 정상 종료
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+else:
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
 # ======= 영상 처리 시작 =======
-process_frame()
-root.mainloop()
-
-cap.release()
-cv2.destroyAllWindows()
+capture_threads = [threading.Thread(target=capture_loop, args=(camera,), daemon=True)
+                   for camera in cameras]
+inference_thread = threading.Thread(target=inference_loop, daemon=True)
+model_thread = threading.Thread(target=load_inspector_model, daemon=True)
+metrics_thread = threading.Thread(target=metrics_loop, daemon=True)
+for thread in capture_threads:
+    thread.start()
+inference_thread.start()
+model_thread.start()
+metrics_thread.start()
+
+if HEADLESS:
+    if FRAME_SHARE:
+        start_dashboard()  # 영상을 볼 방법이 대시보드뿐이므로 모델 준비를 기다리지 않고 시작
+    headless_loop()
+else:
+    process_frame()
+    root.mainloop()
+
+stop_event.set()
+for thread in capture_threads:
+    thread.join(timeout=1)
+inference_thread.join(timeout=5)
+if inference_thread.is_alive():
+    # 추론 중인 배치가 끝나야 마지막 결과까지 기록기에 들어감 (기록기를 먼저 닫으면 버려짐)
+    print("Waiting for inference thread to finish...")
+    inference_thread.join(timeout=30)
+    if inference_thread.is_alive():
+        print("Warning: inference thread did not stop - detections after this point are not logged")
+
+for camera in cameras:
+    camera["cap"].release()
+event_writer.close()
+if snapshot_archive is not None:
+    snapshot_archive.close()
+close_frame_rings()
+if flask_process is not None:
+    flask_process.terminate()
+if not HEADLESS:
+    cv2.destroyAllWindows()  # GUI 없는 OpenCV 빌드(헤드리스 서비스)에서는 구현되지 않아 오류
@@ -0,0 +1,75 @@
+"""
+분할(seg) 모델의 마스크 지연 계산
+
+YOLOv8-seg의 기본 후처리는 매 추론마다 모든 탐지의 마스크를 입력 해상도로 키워서 만들지만,
+검사에는 박스만 쓰므로 LazyMaskPredictor는 박스만 후처리하고 마스크 계수와 프로토타입만 보관.
+마스크가 필요하면(예: ROI 안 결함 면적) mask_areas()로 필요한 탐지만 프로토타입 해상도(입력의 1/4)에서 계산.
+"""
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.models.yolo.detect import DetectionPredictor
+from ultralytics.utils import ops
+
+try:
+    from ultralytics.utils.nms import non_max_suppression
+except ImportError:  # 이전 버전 ultralytics
+    from ultralytics.utils.ops import non_max_suppression
+
+
+class LazyMaskPredictor(DetectionPredictor):
+    """
+    분할 모델 출력에서 박스만 후처리하는 predictor (inference.predict()가 분할 모델에만 사용).
+    결과마다 lazy_masks = {'proto', 'coeffs', 'boxes'(입력 이미지 좌표), 'input_shape'}를 붙여둠.
+    """
+
+    def postprocess(self, preds, img, orig_imgs, **kwargs):
+        # 분할 모델 출력: (박스+클래스+마스크 계수, 프로토타입) - PyTorch는 (.., (.., .., 프로토타입))
+        protos = preds[1][-1] if isinstance(preds[1], tuple) else preds[1]
+
+        # 클래스 수를 명시해서 마스크 계수 채널이 클래스 점수로 섞이지 않게 함
+        detections = non_max_suppression(preds[0], self.args.conf, self.args.iou,
+                                         agnostic=self.args.agnostic_nms, max_det=self.args.max_det,
+                                         nc=len(self.model.names), classes=self.args.classes)
+
+        if not isinstance(orig_imgs, list):  # 입력이 torch.Tensor인 경우
+            orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
+
+        results = []
+        for pred, orig_img, img_path, proto in zip(detections, orig_imgs, self.batch[0], protos):
+            input_boxes = pred[:, :4].clone()
+            pred[:, :4] = ops.scale_boxes(img.shape[2:], pred[:, :4], orig_img.shape)
+            result = Results(orig_img, path=img_path, names=self.model.names, boxes=pred[:, :6])
+            result.lazy_masks = {'proto': proto, 'coeffs': pred[:, 6:], 'boxes': input_boxes,
+                                 'input_shape': img.shape[2:]}
+            results.append(result)
+        return results
+
+
+def mask_areas(result, indices):
+    """
+    result.boxes[indices] 탐지의 마스크 면적(원본 이미지 픽셀 수) 리스트.
+    마스크는 프로토타입 해상도에서만 계산하고 입력 -> 원본 배율로 면적을 환산 (업샘플 없음).
+    마스크 정보가 없으면(탐지 전용 모델) None.
+    """
+    lazy = getattr(result, 'lazy_masks', None)
+    if lazy is None:
+        return None
+    if not len(indices):
+        return []
+
+    proto = lazy['proto']
+    channels, mask_h, mask_w = proto.shape
+    input_h, input_w = lazy['input_shape']
+    index = torch.as_tensor(indices, device=proto.device)
+
+    # 마스크 계수 x 프로토타입 -> 로짓 (시그모이드 0.5 기준 = 로짓 0 기준)
+    logits = (lazy['coeffs'][index].float() @ proto.float().view(channels, -1)).view(-1, mask_h, mask_w)
+    boxes = lazy['boxes'][index].float() * torch.tensor([mask_w / input_w, mask_h / input_h] * 2,
+                                                        device=proto.device)
+    masks = ops.crop_mask((logits > 0).float(), boxes)
+
+    # 프로토타입 한 칸이 원본 이미지에서 차지하는 면적
+    orig_h, orig_w = result.orig_shape
+    gain = min(input_h / orig_h, input_w / orig_w)
+    cell_area = (input_w / mask_w / gain) * (input_h / mask_h / gain)
+    return [int(count * cell_area) for count in masks.sum(dim=(1, 2)).tolist()]
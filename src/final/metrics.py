@@ -0,0 +1,153 @@
+"""
+단계별 처리 시간 측정 (/metrics 용)
+
+with timed("inference"):
+    ...
+처럼 감싸면 단계별 히스토그램에 기록.
+set_gauges()로 현재 값(예: 적응형 조절 단계)도 함께 노출.
+히스토그램은 고정 버킷 누적 카운트(Prometheus histogram)와 최근 WINDOW개 샘플(분위수 계산용)을 유지.
+인스펙터는 다른 프로세스이므로 스냅샷을 INSPECTOR_METRICS_FILE에 주기적으로 저장하고, 대시보드가 읽어서 함께 노출.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from event_store import write_json
+
+# 히스토그램 버킷 상한 (초)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 분위수 계산에 사용할 최근 샘플 수
+WINDOW = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+# 인스펙터 -> 대시보드 공유 파일
+INSPECTOR_METRICS_FILE = "inspector_metrics.json"
+
+
+class Histogram:
+    """단계 하나의 처리 시간 히스토그램"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # 마지막은 +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=WINDOW)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.bucket_counts[index] += 1
+            self.total += seconds
+            self.count += 1
+            self.recent.append(seconds)
+
+    def snapshot(self):
+        """JSON으로 저장할 수 있는 현재 상태"""
+        with self.lock:
+            bucket_counts = list(self.bucket_counts)
+            recent = sorted(self.recent)
+            total, count = self.total, self.count
+
+        quantiles = {}
+        if recent:
+            for q in QUANTILES:
+                quantiles[str(q)] = recent[min(int(q * len(recent)), len(recent) - 1)]
+        return {'buckets': bucket_counts, 'sum': total, 'count': count, 'quantiles': quantiles}
+
+
+# 단계 이름 -> Histogram
+_histograms = {}
+_registry_lock = threading.Lock()
+# 이름 -> 현재 값
+_gauges = {}
+
+
+def histogram(stage):
+    """단계 이름에 해당하는 히스토그램 (없으면 생성)"""
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(stage, Histogram())
+    return hist
+
+
+@contextmanager
+def timed(stage):
+    """with 블록의 실행 시간을 stage 히스토그램에 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(stage).observe(time.perf_counter() - started)
+
+
+def snapshot():
+    """모든 단계의 스냅샷"""
+    return {stage: hist.snapshot() for stage, hist in list(_histograms.items())}
+
+
+def set_gauges(values):
+    """현재 값 갱신 ({이름: 숫자})"""
+    _gauges.update(values)
+
+
+def gauges():
+    return dict(_gauges)
+
+
+def save_snapshot(path=INSPECTOR_METRICS_FILE):
+    """스냅샷을 파일로 저장 (다른 프로세스 공유용)"""
+    write_json(path, {'updated': time.time(), 'pid': os.getpid(), 'stages': snapshot(), 'gauges': gauges()})
+
+
+def load_snapshot(path=INSPECTOR_METRICS_FILE):
+    """save_snapshot()으로 저장한 스냅샷 읽기 (없으면 None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def render_prometheus(snapshots, gauge_values=None):
+    """
+    {프로세스 이름: 단계별 스냅샷}을 Prometheus 텍스트 형식으로 변환.
+    gauge_values: {프로세스 이름: {이름: 값}} (defect_<이름> 게이지로 노출)
+    """
+    lines = [
+        "# HELP defect_stage_seconds Processing time per pipeline stage.",
+        "# TYPE defect_stage_seconds histogram",
+    ]
+    for process, stages in snapshots.items():
+        for stage, snap in sorted(stages.items()):
+            labels = f'process="{process}",stage="{stage}"'
+            cumulative = 0
+            for upper, count in zip(BUCKETS + (float('inf'),), snap['buckets']):
+                cumulative += count
+                le = "+Inf" if upper == float('inf') else repr(upper)
+                lines.append(f'defect_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'defect_stage_seconds_sum{{{labels}}} {snap["sum"]}')
+            lines.append(f'defect_stage_seconds_count{{{labels}}} {snap["count"]}')
+
+    lines += [
+        f"# HELP defect_stage_recent_seconds Quantiles over the last {WINDOW} samples per stage.",
+        "# TYPE defect_stage_recent_seconds gauge",
+    ]
+    for process, stages in snapshots.items():
+        for stage, snap in sorted(stages.items()):
+            for q, value in snap['quantiles'].items():
+                lines.append(f'defect_stage_recent_seconds{{process="{process}",stage="{stage}",'
+                             f'quantile="{q}"}} {value}')
+
+    names = sorted({name for values in (gauge_values or {}).values() for name in values})
+    for name in names:
+        lines.append(f"# TYPE defect_{name} gauge")
+        for process, values in gauge_values.items():
+            if name in values:
+                lines.append(f'defect_{name}{{process="{process}"}} {values[name]}')
+    return "\n".join(lines) + "\n"
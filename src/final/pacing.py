@@ -0,0 +1,97 @@
+"""
+적응형 처리 주기 / 입력 크기 조절
+
+PC마다 CPU 성능이 다르고 다른 프로그램이 같이 돌기도 하므로 고정 주기 대신 실제 처리 시간에 맞춤.
+- 단계별 처리 시간을 지수 이동 평균(EWMA)으로 측정
+- 캡처: 추론 한 주기(frame_interval)보다 자주 디코딩하지 않음 (어차피 큐에서 버려질 프레임)
+- 추론: 결정 지연(캡처 -> 결과)이 목표를 넘으면 (입력 크기, 검출 간격) 단계를 한 단계 낮추고,
+        한 단계 올려도 목표 안에 들어올 만큼 여유가 있으면 다시 올림
+현재 단계는 mode()로 화면/콘솔에, gauges()로 /metrics에 표시.
+"""
+import threading
+import time
+
+
+class AdaptivePacer:
+    """
+    levels: [(모델 입력 크기, 검출 간격)] 품질 높은 순 (첫 단계에서 시작)
+    target_latency: 목표 결정 지연 (초), 조절 주기 동안 가장 느린 항목 기준으로 판단
+    """
+
+    def __init__(self, levels, target_latency, alpha=0.2, adjust_every=2.0, step_up_margin=0.8):
+        self.levels = list(levels)
+        self.target = target_latency
+        self.alpha = alpha                    # EWMA 가중치 (클수록 최근 값 반영이 빠름)
+        self.adjust_every = adjust_every      # 단계 조절 주기 (초)
+        self.step_up_margin = step_up_margin  # 올린 뒤 예상 지연이 목표 x 이 값 이하일 때만 올림
+        self.level = 0
+        self.costs = {}         # 단계 이름 -> 평균 처리 시간 (초)
+        self.latency = None     # 평균 결정 지연 (초)
+        self.worst = 0.0        # 이번 조절 주기 동안 가장 긴 결정 지연 (초)
+        self.next_adjust = time.perf_counter() + adjust_every
+        self.lock = threading.Lock()
+
+    @property
+    def imgsz(self):
+        return self.levels[self.level][0]
+
+    @property
+    def detect_interval(self):
+        return self.levels[self.level][1]
+
+    def observe(self, stage, seconds):
+        """stage 처리 시간 기록"""
+        with self.lock:
+            previous = self.costs.get(stage)
+            self.costs[stage] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def cost(self, stage):
+        """stage 평균 처리 시간 (아직 측정 전이면 0)"""
+        return self.costs.get(stage, 0.0)
+
+    def frame_interval(self):
+        """추론 스레드가 한 주기를 처리하는 시간 (카메라별로 이보다 자주 디코딩할 필요 없음)"""
+        return self.cost("cycle")
+
+    def observe_latency(self, seconds):
+        """프레임 하나의 결정 지연 (캡처 -> 결과) 기록"""
+        with self.lock:
+            self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+            self.worst = max(self.worst, seconds)
+
+    def adjust(self):
+        """
+        조절 주기마다 단계를 한 단계씩 조정.
+        :return: 단계가 바뀌었으면 True
+        """
+        now = time.perf_counter()
+        with self.lock:
+            if now < self.next_adjust or self.latency is None:
+                return False
+            self.next_adjust = now + self.adjust_every
+            worst, self.worst = self.worst, 0.0
+            if worst == 0.0:
+                return False  # 이번 주기에 처리한 프레임 없음
+
+            if worst > self.target and self.level < len(self.levels) - 1:
+                self.level += 1
+                return True
+            if self.level > 0:
+                # 추론 시간은 입력 면적에 비례한다고 보고 한 단계 올렸을 때의 지연 예상
+                scale = (self.levels[self.level - 1][0] / self.imgsz) ** 2
+                if worst * scale <= self.target * self.step_up_margin:
+                    self.level -= 1
+                    return True
+            return False
+
+    def mode(self):
+        """현재 단계 설명 (예: "320px 1/5 42ms")"""
+        latency = f" {self.latency * 1000:.0f}ms" if self.latency is not None else ""
+        return f"{self.imgsz}px 1/{self.detect_interval}{latency}"
+
+    def gauges(self):
+        """/metrics에 노출할 현재 값"""
+        return {'pacing_level': self.level, 'pacing_imgsz': self.imgsz,
+                'pacing_detect_interval': self.detect_interval,
+                'pacing_latency_seconds': self.latency or 0.0,
+                'pacing_target_seconds': self.target}
@@ -0,0 +1,204 @@
+"""
+결함 스냅샷 저장소 (ROI 이미지 + 박스를 그린 전체 프레임)
+
+기록한 결함마다 ROI를 잘라낸 이미지와 박스를 그린 프레임을 JPEG으로 저장.
+- 인코딩/저장은 백그라운드 스레드 풀에서 처리 (대기 작업이 max_pending개를 넘으면 버리므로 카메라/UI 스레드는 기다리지 않음)
+- 파일 이름은 JPEG 내용의 해시 (같은 이미지는 한 번만 저장, 내용이 바뀌지 않으므로 브라우저가 계속 캐시 가능)
+- 썸네일(<해시>_t.jpg)을 같이 만들어 두고 대시보드 목록은 썸네일을 사용
+- 전체 크기가 max_bytes를 넘으면 오래된 스냅샷부터 삭제
+
+snapshots/<해시 앞 2글자>/<해시>.jpg, <해시>_t.jpg
+snapshots/index.jsonl : 결함 하나당 한 줄 (시각, 카메라, 클래스, 신뢰도, 박스, crop/frame 해시)
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+
+from inference import crop_roi
+
+SNAPSHOT_DIR = "snapshots"
+INDEX_FILE = "index.jsonl"
+JPEG_QUALITY = 90
+THUMB_WIDTH = 240
+THUMB_QUALITY = 80
+MAX_BYTES = 2 * 1024 ** 3  # 보관할 최대 크기 (넘으면 RETENTION_RATIO까지 오래된 것부터 삭제)
+RETENTION_RATIO = 0.9
+WORKERS = 2                # 인코딩 스레드 수 (cv2.imencode는 GIL을 놓으므로 병렬로 처리됨)
+MAX_PENDING = 8            # 대기할 수 있는 최대 스냅샷 수
+
+
+def snapshot_path(digest, thumb=False, root=SNAPSHOT_DIR):
+    """해시에 해당하는 이미지(또는 썸네일) 경로"""
+    return os.path.join(root, digest[:2], f"{digest}_t.jpg" if thumb else f"{digest}.jpg")
+
+
+def snapshot_key(timestamp, camera, class_name):
+    """결함 목록(초 단위 현지 시각, 카메라, 클래스)과 스냅샷을 연결하는 키"""
+    return f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S}|{camera}|{class_name}"
+
+
+def read_index(root=SNAPSHOT_DIR, position=None):
+    """
+    index.jsonl에서 position 이후에 추가된 항목과 새 position 반환.
+    position은 (파일 inode, 읽은 바이트 수). 보관 정책으로 파일을 다시 쓰면 inode가 바뀌므로 처음부터 읽음
+    (반환한 position의 inode가 이전과 다르면 호출한 쪽은 이전 항목을 버려야 함).
+    """
+    path = os.path.join(root, INDEX_FILE)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return [], None
+
+    with f:
+        inode = os.fstat(f.fileno()).st_ino
+        offset = position[1] if position is not None and position[0] == inode else 0
+        f.seek(offset)
+        entries = []
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # 기록 중인 마지막 줄
+            offset += len(line)
+            entries.append(json.loads(line))
+    return entries, (inode, offset)
+
+
+def write_file(path, data):
+    """임시 파일에 쓴 뒤 교체 (읽는 쪽이 쓰다 만 이미지를 보지 않도록)"""
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SnapshotArchive:
+    """
+    스냅샷 저장기 (인스펙터용).
+    submit()은 스레드 풀에 작업을 넘기기만 하고, 인코딩/저장/색인/보관 정책은 작업 스레드에서 처리.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, max_bytes=MAX_BYTES, workers=WORKERS, max_pending=MAX_PENDING):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.dropped = 0  # 대기열이 가득 차서 버린 스냅샷 수
+
+        # 보관 정책용 상태 (lock으로 보호)
+        self.lock = threading.Lock()
+        self.entries = deque()   # 색인 항목 (오래된 순)
+        self.refs = Counter()    # 해시 -> 참조하는 항목 수 (같은 이미지를 여러 결함이 공유할 수 있음)
+        self.sizes = {}          # 해시 -> 이미지 + 썸네일 바이트
+        self.total = 0
+
+        os.makedirs(root, exist_ok=True)
+        for entry in read_index(root)[0]:
+            self._add(entry)
+        self.index_file = open(os.path.join(root, INDEX_FILE), 'a', encoding='utf-8')
+
+    def submit(self, frame, roi, detection, camera, timestamp):
+        """
+        스냅샷 저장 예약 (frame은 저장이 끝날 때까지 수정하지 않아야 함).
+        :return: 대기열이 가득 차서 버렸으면 False
+        """
+        if not self.slots.acquire(blocking=False):
+            self.dropped += 1
+            return False
+        future = self.executor.submit(self._save, frame, roi, detection, camera, timestamp)
+        future.add_done_callback(lambda _: self.slots.release())
+        return True
+
+    def _encode(self, image, quality):
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG 인코딩 실패")
+        return encoded.tobytes()
+
+    def _store(self, image):
+        """이미지와 썸네일을 저장하고 해시 반환 (같은 내용이 이미 있으면 다시 쓰지 않음)"""
+        data = self._encode(image, JPEG_QUALITY)
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = snapshot_path(digest, root=self.root)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            height, width = image.shape[:2]
+            scale = min(THUMB_WIDTH / width, 1.0)
+            thumb = cv2.resize(image, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+            # 썸네일을 먼저 써서 원본이 있으면 썸네일도 있도록 함
+            write_file(snapshot_path(digest, thumb=True, root=self.root), self._encode(thumb, THUMB_QUALITY))
+            write_file(path, data)
+        return digest
+
+    def _save(self, frame, roi, detection, camera, timestamp):
+        x1, y1, x2, y2, conf, tag, _ = detection
+        try:
+            crop_digest = self._store(crop_roi(frame, roi))
+
+            # 원본 프레임은 다른 스레드와 공유하므로 복사본에 그림
+            annotated = frame.copy()
+            roi_x, roi_y, roi_w, roi_h = roi
+            cv2.rectangle(annotated, (roi_x, roi_y), (roi_x + roi_w, roi_y + roi_h), (255, 0, 0), 2)
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            cv2.putText(annotated, f"{tag} {conf:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            frame_digest = self._store(annotated)
+
+            entry = {'timestamp': timestamp, 'camera': camera, 'class': tag, 'confidence': round(conf, 4),
+                     'box': [x1, y1, x2, y2], 'crop': crop_digest, 'frame': frame_digest}
+            with self.lock:
+                self.index_file.write(json.dumps(entry) + "\n")
+                self.index_file.flush()
+                self._add(entry)
+                if self.total > self.max_bytes:
+                    self._apply_retention()
+        except (OSError, ValueError) as e:
+            print(f"Error saving snapshot: {e}")
+
+    def _add(self, entry):
+        """색인 항목 추가 (처음 참조하는 이미지만 크기에 더함)"""
+        self.entries.append(entry)
+        for digest in (entry['crop'], entry['frame']):
+            if self.refs[digest] == 0:
+                size = 0
+                for thumb in (False, True):
+                    try:
+                        size += os.path.getsize(snapshot_path(digest, thumb=thumb, root=self.root))
+                    except FileNotFoundError:
+                        pass
+                self.sizes[digest] = size
+                self.total += size
+            self.refs[digest] += 1
+
+    def _apply_retention(self):
+        """오래된 항목부터 지워서 max_bytes x RETENTION_RATIO 이하로 줄이고 색인 파일을 다시 씀"""
+        limit = self.max_bytes * RETENTION_RATIO
+        while self.entries and self.total > limit:
+            entry = self.entries.popleft()
+            for digest in (entry['crop'], entry['frame']):
+                self.refs[digest] -= 1
+                if self.refs[digest] > 0:
+                    continue
+                del self.refs[digest]
+                self.total -= self.sizes.pop(digest)
+                for thumb in (False, True):
+                    try:
+                        os.remove(snapshot_path(digest, thumb=thumb, root=self.root))
+                    except OSError:
+                        pass  # 이미 없거나 (Windows) 대시보드가 보내는 중
+
+        index_path = os.path.join(self.root, INDEX_FILE)
+        self.index_file.close()
+        with open(index_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in self.entries)
+        os.replace(index_path + ".tmp", index_path)
+        self.index_file = open(index_path, 'a', encoding='utf-8')
+
+    def close(self):
+        """대기 중인 스냅샷을 모두 저장하고 종료"""
+        self.executor.shutdown(wait=True)
+        self.index_file.close()
@@ -0,0 +1,139 @@
+"""
+검출 사이 프레임용 경량 추적기
+
+YOLO 검출 프레임에서는 IoU로 기존 트랙과 매칭해서 ID를 유지하고,
+검출 사이 프레임에서는 박스 안 특징점을 광류(Lucas-Kanade)로 따라가 박스를 이동시킴.
+추적에 실패하면 lost를 True로 바꿔서 다음 프레임에 검출을 다시 하도록 알림.
+"""
+import cv2
+import numpy as np
+
+
+def iou(box_a, box_b):
+    """두 박스 (x1, y1, x2, y2)의 IoU"""
+    ix1, iy1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    ix2, iy2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+class BoxTracker:
+    """
+    카메라 하나의 트랙 목록을 관리.
+    트랙: {'id', 'box'(x1, y1, x2, y2 프레임 좌표), 'conf', 'tag', 'points'(특징점), 'missed'}
+    gray는 추적할 영역(ROI 또는 전체 프레임)의 흑백 이미지, origin은 그 영역의 프레임 좌표 (x, y).
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=1, min_points=4, min_track_ratio=0.5):
+        self.iou_threshold = iou_threshold      # 같은 물건으로 볼 최소 IoU
+        self.max_missed = max_missed            # 검출에서 연속으로 놓쳐도 유지할 횟수
+        self.min_points = min_points            # 추적에 필요한 최소 특징점 수
+        self.min_track_ratio = min_track_ratio  # 광류로 따라간 특징점 비율이 이보다 낮으면 추적 실패
+        self.tracks = []
+        self.next_id = 1
+        self.prev_gray = None
+        self.lost = True  # 처음에는 검출이 필요
+
+    def _find_points(self, gray, origin, box):
+        """박스 영역 안에서 추적할 특징점 찾기"""
+        ox, oy = origin
+        height, width = gray.shape
+        x1, y1 = max(int(box[0]) - ox, 0), max(int(box[1]) - oy, 0)
+        x2, y2 = min(int(box[2]) - ox, width), min(int(box[3]) - oy, height)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None
+
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        return cv2.goodFeaturesToTrack(gray, maxCorners=20, qualityLevel=0.01, minDistance=3, mask=mask)
+
+    def results(self):
+        """현재 보이는 트랙을 (x1, y1, x2, y2, conf, tag, track_id) 리스트로 반환"""
+        return [(int(t['box'][0]), int(t['box'][1]), int(t['box'][2]), int(t['box'][3]),
+                 t['conf'], t['tag'], t['id'])
+                for t in self.tracks if t['missed'] == 0]
+
+    def reset(self):
+        """트랙을 모두 지움 (제품이 빠져나감). ID는 계속 증가하므로 다음 물건이 이전 ID를 이어받지 않음"""
+        self.tracks = []
+        self.prev_gray = None
+        self.lost = True
+
+    def track_ids(self):
+        """살아 있는 트랙 ID 집합"""
+        return {t['id'] for t in self.tracks}
+
+    def update(self, gray, origin, detections):
+        """
+        검출 프레임: 탐지 결과를 기존 트랙과 IoU로 매칭해서 ID를 이어 붙임.
+        :param detections: (x1, y1, x2, y2, conf, tag, ...) 리스트
+        """
+        # IoU가 큰 쌍부터 탐욕적으로 매칭 (같은 클래스끼리만)
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, detection in enumerate(detections):
+                if track['tag'] == detection[5]:
+                    score = iou(track['box'], detection[:4])
+                    if score >= self.iou_threshold:
+                        pairs.append((score, ti, di))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_detections = set(), set()
+        for _, ti, di in pairs:
+            if ti in matched_tracks or di in matched_detections:
+                continue
+            matched_tracks.add(ti)
+            matched_detections.add(di)
+            x1, y1, x2, y2, conf, tag = detections[di][:6]
+            self.tracks[ti].update(box=[x1, y1, x2, y2], conf=conf, missed=0)
+
+        # 놓친 트랙은 max_missed번까지만 유지
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track['missed'] += 1
+        self.tracks = [t for t in self.tracks if t['missed'] <= self.max_missed]
+
+        # 매칭되지 않은 탐지는 새 트랙
+        for di, detection in enumerate(detections):
+            if di not in matched_detections:
+                x1, y1, x2, y2, conf, tag = detection[:6]
+                self.tracks.append({'id': self.next_id, 'box': [x1, y1, x2, y2], 'conf': conf,
+                                    'tag': tag, 'points': None, 'missed': 0})
+                self.next_id += 1
+
+        for track in self.tracks:
+            if track['missed'] == 0:
+                track['points'] = self._find_points(gray, origin, track['box'])
+
+        self.prev_gray = gray
+        self.lost = False
+        return self.results()
+
+    def propagate(self, gray, origin):
+        """검출 사이 프레임: 특징점의 광류로 박스를 이동"""
+        for track in self.tracks:
+            if track['missed'] > 0:
+                continue
+
+            points = track['points']
+            if self.prev_gray is None or points is None or len(points) < self.min_points:
+                self.lost = True
+                continue
+
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+            good = status.ravel() == 1
+            if good.sum() < max(self.min_points, self.min_track_ratio * len(points)):
+                self.lost = True
+                continue
+
+            # 특징점 이동량의 중앙값만큼 박스 이동
+            dx, dy = np.median(new_points[good] - points[good], axis=0).ravel()
+            track['box'] = [track['box'][0] + dx, track['box'][1] + dy,
+                            track['box'][2] + dx, track['box'][3] + dy]
+            track['points'] = new_points[good].reshape(-1, 1, 2)
+
+        self.prev_gray = gray
+        return self.results()